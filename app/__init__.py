@@ -1,15 +1,30 @@
 import dash
 import dash_core_components as dcc
 import dash_html_components as html
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 import plotly.graph_objs as go
 
+import base64
+import functools
 import json
+from urllib.parse import urlencode
 import numpy as np
 
 from app.components.helpers import row, col, container, panel, stat_summary_box
 from app.components.output_panel import output_panel
-from app.components.control_panel import control_panel
+from app.components.control_panel import control_panel, storage_types
+from app.cache import canonical_key, default_cache
+from app.metrics import cache_samples, default_metrics, instrument_server, slow_request_threshold
+from app.jobs import default_runner, sweep_chunk_size
+from app.api import register_api
+from storagecosts import (
+    simulate, simulate_batch, simulate_daily, compare_storage_pairs, normalize_inputs, resample,
+    envelope_indices, catalog_version)
+from storagecosts.montecarlo import percentile_bands
+from storagecosts.sensitivity import sensitivity, sensitivity_inputs, integer_inputs
+from storagecosts.optimize import optimize_retention_split
+from storagecosts.cohorts import cohort_costs
 
 external_stylesheets = [
     'https://codepen.io/chriddyp/pen/bWLwgP.css', 
@@ -18,8 +33,14 @@ external_stylesheets = [
 
 app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
 
+metrics = default_metrics()
+instrument_server(app.server, metrics, slow_request_threshold(), outputs=app.callback_map)
+job_runner = default_runner()
+
 app.layout = html.Div([
-    html.Div(id="data-store", style={'display': 'none'}),
+    html.Div(id="scenario-store", style={'display': 'none'}),
+    dcc.Store(id="data-store"),
+    dcc.Store(id="uncertainty-store"),
     html.H2("The cost of genomic data storage in the clinical lab"),
     row([
         col('col-md-4', control_panel, style={"width": 600}),
@@ -28,125 +49,102 @@ app.layout = html.Div([
 ])
 
 
-def calc_cost(cost_buckets: list, amount):
-    if amount <= cost_buckets[0][0] or len(cost_buckets) < 2:
-        return cost_buckets[0][1] * amount
-    return calc_cost(cost_buckets, cost_buckets[0][0]) + calc_cost(cost_buckets[1:], amount - cost_buckets[0][0])
-
-    
-storage_cost_buckets = {
-    "S3": [[50000, 0.023], [450000, 0.022], [np.inf, 0.021]],
-    "glacier": [[np.inf, 0.004]],
-    "deepglacier": [[np.inf, 0.00099]],
-    "S3IA":    [[np.inf, 0.0125]],
-    "S3IASAZ": [[np.inf, 0.01]],
-    "gcp_regional": [[np.inf, 0.02]],
-    "gcp_nearline": [[np.inf, 0.01]],
-    "gcp_coldline": [[np.inf, 0.007]],
-    "gcp_archive": [[np.inf, 0.0025]],
-    "azure_zrs_hot": [[50000, 0.023], [450000, 0.0221], [np.inf, 0.0212]],
-    "azure_zrs_cool": [[np.inf, 0.0125]],
-    "azure_lrs_hot": [[50000, 0.0184], [450000, 0.0177], [np.inf, 0.017]],
-    "azure_lrs_cool": [[np.inf, 0.01]],
-    "azure_lrs_archive": [[np.inf, 0.00099]],
-}
-
-transfer_cost_buckets = {
-    "s3": [[1, 0], [9999, 0.09], [40000, 0.085], [100000, 0.07], [np.inf, 0.05]],
-    "glacier": [[1, 0], [9999, 0.09], [40000, 0.085], [100000, 0.07], [np.inf, 0.05]],
-    "gcp": [[1000, 0.12], [9000, 0.11], [np.inf, 0.08]],
-    "azure": [[5, 0], [9995, 0.087], [40000, 0.083], [100000, 0.07], [np.inf, 0.05]]
-}
-
-def calc_storage_cost(storage_type, gb):
-    return calc_cost(storage_cost_buckets[storage_type], gb)
-
-def calc_reaccess_cost(storage_type, gb):
-    if storage_type in ["S3"]:
-        return 0
-    elif storage_type in ["S3IA", "S3IASAZ"]:
-        return gb * 0.01
-    elif storage_type in ["glacier", "deepglacier"]:
-        return gb * 0.0025
-    elif storage_type == "gcp_regional":
-        return 0
-    elif storage_type == "gcp_nearline":
-        return gb * 0.01
-    elif storage_type == "gcp_coldline":
-        return gb * 0.02
-    elif storage_type == "gcp_archive":
-        return gb * 0.05
-    elif storage_type in ["azure_lrs_hot", "azure_zrs_hot"]:
-        return 0
-    elif storage_type in ["azure_lrs_cool", "azure_zrs_cool"]:
-        return gb * 0.01
-    elif storage_type in ["azure_lrs_archive"]:
-        return gb * 0.02
-    else:
-        raise Exception("unknown reaccess costs")
-
-
-def calc_transfer_cost(storage_type, destination, gb):
-    assert destination in ["internet", "within-cloud"]
-    if destination == "within-cloud":
-        return 0
-    else: # to internet
-        if storage_type in ["S3", "S3IA", "S3IASAZ"]:
-            return calc_cost(transfer_cost_buckets["s3"], gb)
-        elif storage_type in ["glacier", "deepglacier"]:
-            return calc_cost(transfer_cost_buckets["glacier"], gb)
-        elif storage_type.startswith("gcp"):
-            return calc_cost(transfer_cost_buckets["gcp"], gb)
-        elif storage_type.startswith("azure"):
-            return calc_cost(transfer_cost_buckets["azure"], gb)
-        else:
-            raise Exception("unknown transfer costs")
-
-def get_compression_factor(file_type):
-    if file_type == "BAM":
-        return 1
-    elif file_type == "CRAMV2":
-        return 0.7
-    elif file_type == "CRAMV3":
-        return 0.6
-    else:
-        raise("Invalid compression type")
-
-
-def resample(array, interval, func=np.sum):
-    a = np.array(array).reshape(-1, interval)
-    return list(np.apply_along_axis(func, 1, a))
+# The data shown in the output panel is computed in stages: simulate, then
+# resample into the data-store payload, then render. Only stages that cost
+# far more than a cache round trip are cached (shared between workers) under
+# their name and arguments: the final payload, not the simulation it is
+# resampled from (under 1 ms), and the slow analyses (uncertainty,
+# sensitivity, ...). Bump the version whenever a stage's output format
+# changes; pricing catalog edits change `catalog_version`, which is part of
+# every key.
+STAGE_VERSION = "stages-5"
+result_cache = default_cache()
+metrics.register(cache_samples(result_cache))
+
+def stage(name, encode=None, decode=None):
+    # cached values are strings; `encode`/`decode` convert any other output
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            with metrics.timer("storagecosts_stage_seconds", stage=name, cache="hit") as timer:
+                cached = lookup(*args)
+                if cached is not None:
+                    return cached
+                timer.labels["cache"] = "miss"
+                return store(func(*args), *args)
+
+        def lookup(*args):
+            # the cached value for `args`, or None
+            cached = result_cache.get(canonical_key(STAGE_VERSION, catalog_version, name, args))
+            if cached is not None and decode:
+                return decode(cached)
+            return cached
+
+        def store(value, *args):
+            # cache a value computed elsewhere (e.g. in a batch) as the result for `args`
+            if result_cache.enabled:
+                with metrics.timer("storagecosts_encode_seconds", stage=name):
+                    encoded = encode(value) if encode else value
+                metrics.observe("storagecosts_stage_bytes", len(encoded), stage=name)
+                result_cache.set(canonical_key(STAGE_VERSION, catalog_version, name, args), encoded)
+            return value
+
+        wrapper.lookup = lookup
+        wrapper.store = store
+        return wrapper
+    return decorator
+
+def pack_arrays(arrays, dtype=np.float64):
+    # columns of numbers as base64 strings of their raw bytes
+    return {
+        k: base64.b64encode(np.ascontiguousarray(v, dtype=dtype).tobytes()).decode('ascii')
+        for k, v in arrays.items()}
+
+def unpack_arrays(packed, dtype=np.float64):
+    return {k: np.frombuffer(base64.b64decode(v), dtype=dtype) for k, v in packed.items()}
+
+# control panel values that define a scenario, in the order expected by normalize_inputs
+scenario_inputs = [
+    ('control-panel-volumes-pane-toggle', 'on'),
+    ('simple-volumes-genome-count', 'value'),
+    ('simple-volumes-exomes-count', 'value'),
+    ('simple-volumes-large-panel-count', 'value'),
+    #('simple-volumes-small-panel-count', 'value'),
+    ('volumes-genome-count', 'value'),
+    ('volumes-exome-count', 'value'),
+    ('volumes-panel-count', 'value'),
+    ('volumes-genome-size', 'value'),
+    ('volumes-exome-size', 'value'),
+    ('volumes-panel-size', 'value'),
+    ('file-type-radio', 'value'),
+    ('retention-time-tier1', 'value'),
+    ('retention-time-tier1-units', 'value'),
+    ('retention-years-tier2', 'value'),
+    ('tier1-storage-type', 'value'),
+    ('tier2-storage-type', 'value'),
+    ('volume-growth', 'value'),
+    ('total-years-simulated', 'value'),
+    ('reaccess-count', 'value'),
+    ('reaccess-target', 'value'),
+]
 
-def convert_int64(o):
-        if isinstance(o, np.int64): return int(o)  
-        raise TypeError
+@app.callback(
+    Output('scenario-store', 'children'),
+    [Input(component_id=c, component_property=p) for c, p in scenario_inputs]
+)
+@metrics.timed("storagecosts_callback_seconds", callback="update_scenario")
+def update_scenario(*values):
+    return json.dumps(normalize_inputs(*values))
 
 @app.callback(
-    Output('data-store', 'children'),
-    [
-     Input(component_id='control-panel-volumes-pane-toggle', component_property='on'),
-     Input(component_id='simple-volumes-genome-count', component_property='value'),
-     Input(component_id='simple-volumes-exomes-count', component_property='value'),
-     Input(component_id='simple-volumes-large-panel-count', component_property='value'),
-     #Input(component_id='simple-volumes-small-panel-count', component_property='value'),
-     Input(component_id='volumes-genome-count', component_property='value'),
-     Input(component_id='volumes-exome-count', component_property='value'),
-     Input(component_id='volumes-panel-count', component_property='value'),
-     Input(component_id='volumes-genome-size', component_property='value'),
-     Input(component_id='volumes-exome-size', component_property='value'),
-     Input(component_id='volumes-panel-size', component_property='value'),
-     Input(component_id='file-type-radio', component_property='value'),
-     Input(component_id='retention-time-tier1', component_property='value'),
-     Input(component_id='retention-time-tier1-units', component_property='value'),
-     Input(component_id='retention-years-tier2', component_property='value'),
-     Input(component_id='tier1-storage-type', component_property='value'),
-     Input(component_id='tier2-storage-type', component_property='value'),
-     Input(component_id='volume-growth', component_property='value'),
-     Input(component_id='total-years-simulated', component_property='value'),
-     Input(component_id='reaccess-count', component_property='value'),
-     Input(component_id='reaccess-target', component_property='value'),
+    Output('data-store', 'data'),
+    [Input(component_id='scenario-store', component_property='children'),
      Input(component_id='time-interval-setting', component_property='value')]
 )
+@metrics.timed("storagecosts_callback_seconds", callback="update_data_store")
+def update_data_store(scenario, interval):
+    return payload_stage(json.loads(scenario), interval)
+
 def do_calculation(
                 is_custom,
                 simple_genome_count, simple_exome_count, 
@@ -161,142 +159,119 @@ def do_calculation(
                 reaccess_count, reaccess_target,
                 interval):
 
-    compression = get_compression_factor(file_type)
-
-    if not is_custom:
-        genome_count = simple_genome_count
-        genome_size = 120 * compression
-        exome_count = simple_exome_count
-        exome_size = 6 * compression
-        panel_count = simple_large_panel_count
-        panel_size = 1 * compression
-
-    # note this routine defines timepoints in MONTHS
-    
-    # convert years from input to months (for calculations)
-    if retention_time_tier1_units == "years":
-        retention_time_tier1 = retention_time_tier1 * 12
-    retention_time_tier2 = retention_years_tier2 * 12
-    total_time_simulated = total_years_simulated * 12
-
-    # find maximum timeframe we need to calculate
-    m = max(retention_time_tier1, retention_time_tier1+retention_time_tier2, total_time_simulated+1)
-    timepoints = list(range(1,m))
-
-    # for first month, define running_total_samples as 1/12th of total yearly samples
-    yearly_total_samples = (genome_count + exome_count + panel_count)
-    running_total_samples = yearly_total_samples / 12.
-    
-    # same for total gb stored
-    yearly_total_gb = (genome_count * genome_size) + (exome_count * exome_size) + (panel_count * panel_size)
-    running_total_gb = yearly_total_gb / 12.
-    
-    # define monthly multiplier based on yearly percent growth
-    monthly_volume_multiplier = (1 + float(volume_growth/12./100))
-
-    # same for reaccess-count
-    monthly_reaccess_count = reaccess_count/12.
-
-    # initialize arrays and counters
-    costs_array = []
-    tier1_storage_cost_array = []
-    tier2_storage_cost_array = []
-    reaccess_cost_array = []
-    total_stored_array = []
-    total_gb_stored_array = []
-    samples_run_array = []
-    running_total_tier1 = 0
-    running_total_tier2 = 0
-
-    for y in timepoints:
-        total_gb_stored_array.append(running_total_gb)
-        if y <= retention_time_tier1:
-            # while in tier1 retention phase, all data is simply 
-            # put into tier1 storage
-            running_total_tier1 += running_total_gb
-        elif y <= (retention_time_tier1 + retention_time_tier2):
-            # once we are in the range where tier2 storage is used
-            # data from `y - retention_time_tier1` is moved into 
-            # tier2, and the runnign total is added to tier1
-            running_total_tier1 -= total_gb_stored_array[y-retention_time_tier1]
-            running_total_tier2 += total_gb_stored_array[y-retention_time_tier1]
-            running_total_tier1 += running_total_gb
-        else:
-            # Once we are outside the life of the data, we discard tier2 
-            running_total_tier2 -= total_gb_stored_array[y-(retention_time_tier1 + retention_time_tier2)]
-            # data is still moved from tier1 to tier2
-            running_total_tier1 -= total_gb_stored_array[y-retention_time_tier1]
-            running_total_tier2 += total_gb_stored_array[y-retention_time_tier1]
-            # we add new data to tier1
-            running_total_tier1 += running_total_gb
-
-        # calculate storage costs
-        tier1_cost = calc_storage_cost(tier1_storage_type, running_total_tier1)
-        tier2_cost = calc_storage_cost(tier2_storage_type, running_total_tier2)
-
-        # calculate re-access costs, includes transfer cost
-        if (running_total_tier1 + running_total_tier2) > 0:
-            total_gb_reaccessed = ((monthly_reaccess_count * genome_count / yearly_total_samples) * genome_size) + \
-                                  ((monthly_reaccess_count * exome_count / yearly_total_samples) * exome_size) + \
-                                  ((monthly_reaccess_count * panel_count / yearly_total_samples) * panel_size)
-
-            fraction_in_tier1 = running_total_tier1 / float(running_total_tier1 + running_total_tier2)
-            fraction_in_tier2 = running_total_tier2 / float(running_total_tier1 + running_total_tier2)
-
-            tier1_reaccess_cost = calc_reaccess_cost(tier1_storage_type, total_gb_reaccessed * (fraction_in_tier1))            
-            tier2_reaccess_cost = calc_reaccess_cost(tier2_storage_type, total_gb_reaccessed * (fraction_in_tier2))
-            
-            tier1_transfer_cost = calc_transfer_cost(tier1_storage_type, reaccess_target, total_gb_reaccessed * (fraction_in_tier1))
-            tier2_transfer_cost = calc_transfer_cost(tier2_storage_type, reaccess_target, total_gb_reaccessed * (fraction_in_tier2))
-            
-            reaccess_cost = tier1_reaccess_cost + tier2_reaccess_cost + tier1_transfer_cost + tier2_transfer_cost
-        else:
-            reaccess_cost = 0
-
-        
-        # record costs in arrays
-        tier1_storage_cost_array.append(tier1_cost)
-        tier2_storage_cost_array.append(tier2_cost)
-        reaccess_cost_array.append(reaccess_cost)
-        total_stored_array.append(running_total_tier1 + running_total_tier2)
-        samples_run_array.append(running_total_samples)
-        costs_array.append(tier1_cost + tier2_cost + reaccess_cost)
-        
-        # increase total samples and GB generated in this iteration
-        running_total_gb = running_total_gb * monthly_volume_multiplier
-        running_total_samples = running_total_samples * monthly_volume_multiplier
+    scenario = normalize_inputs(
+        is_custom,
+        simple_genome_count, simple_exome_count,
+        simple_large_panel_count,
+        genome_count, exome_count, panel_count,
+        genome_size, exome_size, panel_size,
+        file_type,
+        retention_time_tier1, retention_time_tier1_units,
+        retention_years_tier2,
+        tier1_storage_type, tier2_storage_type,
+        volume_growth, total_years_simulated,
+        reaccess_count, reaccess_target)
+    return payload_stage(scenario, interval)
+
+
+payload_dtype = np.float32
+
+# an interval of 0 selects the daily simulation; its series are downsampled
+# to about this many points for plotting
+daily_interval = 0
+max_plot_points = 1000
+
+@stage("payload", encode=json.dumps, decode=json.loads)
+def payload_stage(scenario, interval):
+    # payload for the `data-store`
+    if interval == daily_interval:
+        return daily_payload(scenario)
+    return monthly_payload(scenario, interval, simulate(scenario))
+
+def monthly_payload(scenario, interval, monthly):
+    total_stored_array = monthly["total_stored"]
+    samples_run_array = monthly["samples_run"]
+    costs_array = monthly["costs"]
+    tier1_storage_cost_array = monthly["tier1_storage_cost"]
+    tier2_storage_cost_array = monthly["tier2_storage_cost"]
+    reaccess_cost_array = monthly["reaccess_cost"]
 
     # resample data to 1-month, 3-month, 6-month or 12-month intervals
-    timepoints = list(((np.array(timepoints)-1).reshape(-1, interval)[:,0]/interval).astype(int))
-    total_stored_array = resample(total_stored_array, interval, max)
+    total_stored_array = resample(total_stored_array, interval, "max")
     samples_run_array = resample(samples_run_array, interval)
     costs_array = resample(costs_array, interval)
     tier1_storage_cost_array = resample(tier1_storage_cost_array, interval)
     tier2_storage_cost_array = resample(tier2_storage_cost_array, interval)
     reaccess_cost_array = resample(reaccess_cost_array, interval)
-    
-    y_max = max(50, max(costs_array) * 1.1)
-    y_max2 = max(50, max(total_stored_array) * 1.8)
-    if y_max2 >= 1000:
-        total_stored_array = list(np.array(total_stored_array)/1000.)
-        y_max2 = y_max2 / 1000.
-        units = "TB"
-    else:
-        units = "GB"
 
-    data = {
-        "timepoints": timepoints,
+    return build_payload(scenario, interval, {
         "total_stored_array": total_stored_array,
         "samples_run_array": samples_run_array,
         "costs_array": costs_array,
         "tier1_storage_cost_array": tier1_storage_cost_array,
         "tier2_storage_cost_array": tier2_storage_cost_array,
         "reaccess_cost_array": reaccess_cost_array,
+    })
+
+def payload_batch(scenarios, interval):
+    # data-store payloads for many scenarios: cached payloads are reused and
+    # the remaining scenarios are simulated together
+    if interval == daily_interval:
+        return [payload_stage(scenario, interval) for scenario in scenarios]
+    payloads = {}
+    missing = {}
+    for scenario in scenarios:
+        key = canonical_key(scenario)
+        if key not in payloads:
+            payloads[key] = payload_stage.lookup(scenario, interval)
+            if payloads[key] is None:
+                missing[key] = scenario
+    with metrics.timer("storagecosts_stage_seconds", stage="simulate-batch", cache="miss"):
+        simulated = simulate_batch(list(missing.values()))
+    for (key, scenario), monthly in zip(missing.items(), simulated):
+        payloads[key] = payload_stage.store(monthly_payload(scenario, interval, monthly), scenario, interval)
+    return [payloads[canonical_key(scenario)] for scenario in scenarios]
+
+def daily_payload(scenario):
+    daily = simulate_daily(scenario)
+    columns = {k + "_array": daily[k] for k in
+               ["total_stored", "samples_run", "costs", "tier1_storage_cost", "tier2_storage_cost", "reaccess_cost"]}
+    # keep the min/max of the total cost within each bin of days; all series
+    # are sent at those days, with the days as an extra column
+    timepoints = envelope_indices(columns["costs_array"], max_plot_points)
+    return build_payload(scenario, daily_interval, columns, timepoints)
+
+def build_payload(scenario, interval, columns, timepoints=None):
+    genome_count, exome_count, panel_count = scenario["genome_count"], scenario["exome_count"], scenario["panel_count"]
+    genome_size, exome_size, panel_size = scenario["genome_size"], scenario["exome_size"], scenario["panel_size"]
+    yearly_total_samples = (genome_count + exome_count + panel_count)
+    yearly_total_gb = (genome_count * genome_size) + (exome_count * exome_size) + (panel_count * panel_size)
+
+    y_max = max(50, np.max(columns["costs_array"], initial=0) * 1.1)
+    y_max2 = max(50, np.max(columns["total_stored_array"], initial=0) * 1.8)
+    if y_max2 >= 1000:
+        columns["total_stored_array"] = columns["total_stored_array"]/1000.
+        y_max2 = y_max2 / 1000.
+        units = "TB"
+    else:
+        units = "GB"
+
+    # The data-store payload is columnar: the plotted series are sent as
+    # float32 base64 columns, while totals used by the pie chart and stats
+    # boxes are computed here at full precision, before any downsampling.
+    totals = {k: float(np.sum(v)) for k, v in columns.items() if k != "total_stored_array"}
+    if timepoints is not None:
+        columns = {k: v[timepoints] for k, v in columns.items()}
+        columns["timepoints"] = timepoints
+    return {
+        "length": len(columns["costs_array"]),
+        "columns": pack_arrays(columns, payload_dtype),
+        "totals": totals,
         "units": units,
         "interval": int(interval),
         "y_max": int(y_max),
         "y_max2": int(y_max2),
-        "test_count_fractional": {  
+        "test_count_fractional": {
             "genome": genome_count / yearly_total_samples,
             "exome": exome_count / yearly_total_samples,
             "panel": panel_count / yearly_total_samples,
@@ -307,116 +282,186 @@ def do_calculation(
             "panel": (panel_count * panel_size) / yearly_total_gb,
         } if yearly_total_gb > 0 else {"genome": 0, "exome": 0, "panel": 0},
     }
-    # see here for info about the `default` arg (needed to serialize np.int64s in python3)
-    # https://stackoverflow.com/questions/11942364/typeerror-integer-is-not-json-serializable-when-serializing-json-in-python
-    return json.dumps(data, default=convert_int64)
 
+def decode_payload(payload):
+    # data-store payload -> dict with numpy arrays for each series
+    data = dict(payload)
+    data.update(unpack_arrays(payload["columns"], payload_dtype))
+    if "timepoints" not in data:
+        data["timepoints"] = np.arange(payload["length"])
+    return data
+
+register_api(app.server, metrics, payload_batch, functools.partial(unpack_arrays, dtype=payload_dtype))
+
+def uncertainty_distributions(scenario, growth_sd, reaccess_sd, size_sd):
+    # normal distributions around the scenario's values; sizes vary together
+    # through a shared compression factor
+    return {
+        "volume_growth": ("normal", scenario["volume_growth"], growth_sd or 0),
+        "reaccess_count": ("normal", scenario["reaccess_count"], scenario["reaccess_count"] * (reaccess_sd or 0) / 100.),
+        "compression": ("normal", 1, (size_sd or 0) / 100.),
+    }
+
+@app.callback(
+    Output('uncertainty-store', 'data'),
+    [Input(component_id='scenario-store', component_property='children'),
+     Input(component_id='time-interval-setting', component_property='value'),
+     Input(component_id='uncertainty-trials', component_property='value'),
+     Input(component_id='uncertainty-growth-sd', component_property='value'),
+     Input(component_id='uncertainty-reaccess-sd', component_property='value'),
+     Input(component_id='uncertainty-size-sd', component_property='value')]
+)
+@metrics.timed("storagecosts_callback_seconds", callback="update_uncertainty_store")
+def update_uncertainty_store(scenario, interval, trials, growth_sd, reaccess_sd, size_sd):
+    # the uncertainty bands come from the monthly model only
+    if not scenario or not trials or interval == daily_interval:
+        return None
+    scenario = json.loads(scenario)
+    distributions = uncertainty_distributions(scenario, growth_sd, reaccess_sd, size_sd)
+    return uncertainty_stage(scenario, distributions, min(int(trials), 10000), interval)
+
+@stage("uncertainty", encode=json.dumps, decode=json.loads)
+def uncertainty_stage(scenario, distributions, trials, interval):
+    # P10/P50/P90 cost bands over `trials` draws of the scenario
+    bands = percentile_bands(scenario, distributions, trials, interval=interval)
+    low, median, high = bands["costs"]
+    return {
+        "trials": trials,
+        "columns": pack_arrays({"costs_p10": low, "costs_p50": median, "costs_p90": high}, payload_dtype),
+        "lifetime_cost": bands["lifetime_cost"].tolist(),
+    }
+
+
+interval_names = {0: "Daily", 1: "Monthly", 3: "Quarterly", 6: "Half-yearly", 12: "Yearly"}
 
 @app.callback(
-    Output('plot', 'figure'),
-    [Input(component_id='data-store', component_property='children')])
+    [Output('plot', 'figure'),
+     Output('piechart', 'figure'),
+     Output('stats-boxes', 'children')],
+    [Input(component_id='data-store', component_property='data'),
+     Input(component_id='uncertainty-store', component_property='data')])
+@metrics.timed("storagecosts_callback_seconds", callback="update_outputs")
+def update_outputs(payload, uncertainty):
+    if payload is None:
+        raise PreventUpdate
+    return render(payload, uncertainty)
+
+def render(payload, uncertainty=None):
+    # render stage: decode the payload once and build all outputs from it
+    data = decode_payload(payload)
+    if uncertainty is not None:
+        data["uncertainty"] = dict(uncertainty, **unpack_arrays(uncertainty["columns"], payload_dtype))
+    outputs = []
+    for figure, build in [("plot", update_plot), ("piechart", update_piechart), ("stats", update_stats)]:
+        with metrics.timer("storagecosts_figure_seconds", figure=figure):
+            outputs.append(build(data))
+    return tuple(outputs)
+
+# Figures are plain dicts: plotly's graph objects validate every property on
+# every update. The parts that never change are built once here, and each
+# update only fills in the data and the ranges, titles and ticks.
+plot_layout = {
+    "margin": dict(l=70,r=60,t=20,b=60),
+    "height": 500,
+    "yaxis": {
+        "fixedrange": True,
+        "hoverformat": '.0f',
+        "tickprefix": "$",
+    },
+    "yaxis2": {
+        "fixedrange": True,
+        "hoverformat": '.1f',
+        "overlaying": 'y',
+        "showgrid": False,
+        "side": 'right',
+    },
+    "xaxis": {
+        "fixedrange": True,
+    },
+    "legend": dict(orientation="h", y=1.05, x=0.18),
+    "uirevision": 'same' # preserve layout even when parameters change
+}
+
+band_edge_trace = {"type": "scatter", "hoverinfo": "none", "line": {"color": "rgb(255,127,14)", "width": 0}}
+
+def uncertainty_traces(data):
+    # shaded P10-P90 range and median of the Monte Carlo cost bands
+    bands = data["uncertainty"]
+    return [
+        dict(band_edge_trace, x=data["timepoints"], y=bands["costs_p90"], showlegend=False),
+        dict(band_edge_trace, x=data["timepoints"], y=bands["costs_p10"],
+             fill="tonexty", fillcolor="rgba(255,127,14,0.2)", name="P10-P90 Cost"),
+        {"type": "scatter", "x": data["timepoints"], "y": bands["costs_p50"],
+         "line": {"color": "rgb(255,127,14)", "dash": "dash"},
+         "name": "Median Cost (%d trials)" % bands["trials"]},
+    ]
+
 def update_plot(data):
-    data = json.loads(data)
-    
-    if data["interval"] == 1:
-        interval_str = "Monthly"
-        x_tickvals = list(np.array(data["timepoints"]).reshape(-1,12)[:,0])
-        x_ticklabels = x_tickvals
+    interval_str = interval_names[data["interval"]]
+    # one tick per year
+    if data["interval"] == daily_interval:
+        days = data["timepoints"][-1] + 1 if data["length"] else 0
+        x_tickvals = np.round(np.arange(0, days, 365.25)).astype(int)
+        x_title = "Days"
     else:
-        interval_str = "Yearly"
-        x_tickvals = data["timepoints"]
-        x_ticklabels = x_tickvals
+        x_tickvals = data["timepoints"][::max(1, 12 // data["interval"])]
+        x_title = interval_str.replace("ly", "s")
+    x_ticklabels = x_tickvals
+    y_max = data["y_max"]
+    if "uncertainty" in data:
+        y_max = max(y_max, int(np.max(data["uncertainty"]["costs_p90"], initial=0) * 1.1))
 
     traces = [
-        go.Bar(
-            x= data["timepoints"],
-            y = data["total_stored_array"],
-            name="Total %s Stored" % data["units"],
-            yaxis='y2',
-            opacity=0.6,
-        ),
-        go.Scatter(
-            x = data["timepoints"],
-            y = data["costs_array"],
-            name="Total %s Cost" % interval_str
-        ),
-        go.Scatter(
-            x = data["timepoints"],
-            y = data["tier1_storage_cost_array"],
-            name="Tier 1 Cost",
-            visible = "legendonly"
-        ),
-        go.Scatter(
-            x = data["timepoints"],
-            y = data["tier2_storage_cost_array"],
-            name="Tier 2 Cost",
-            visible = "legendonly"
-        ),
+        {"type": "bar", "x": data["timepoints"], "y": data["total_stored_array"],
+         "name": "Total %s Stored" % data["units"], "yaxis": 'y2', "opacity": 0.6},
+        {"type": "scatter", "x": data["timepoints"], "y": data["costs_array"],
+         "name": "Total %s Cost" % interval_str},
+        {"type": "scatter", "x": data["timepoints"], "y": data["tier1_storage_cost_array"],
+         "name": "Tier 1 Cost", "visible": "legendonly"},
+        {"type": "scatter", "x": data["timepoints"], "y": data["tier2_storage_cost_array"],
+         "name": "Tier 2 Cost", "visible": "legendonly"},
     ]
-    return {
-        'data': traces,
-        'layout': {
-            "margin": dict(l=70,r=60,t=20,b=60),
-            "height": 500,
-            "yaxis": go.layout.YAxis(
-                        range=[0,data["y_max"]],
-                        title="Total %s Cost" % interval_str,
-                        tickprefix="$",
-                        hoverformat = '.0f',
-                        fixedrange=True),
-            "yaxis2": go.layout.YAxis(
-                        range=[0,data["y_max2"]],
-                        showgrid=False,
-                        title="Total %s Stored" % data["units"], 
-                        ticksuffix=data["units"],
-                        overlaying='y',
-                        hoverformat = '.1f',
-                        side='right',
-                        fixedrange=True),
-            "xaxis": go.layout.XAxis(
-                        title=interval_str.replace("ly", "s"),
-                        ticktext=x_ticklabels,
-                        tickvals=x_tickvals,
-                        fixedrange=True),
-            "legend": dict(orientation="h", y=1.05, x=0.18),
-            "uirevision": 'same' # preserve layout even when parameters change
-        }
-    }
+    if "uncertainty" in data:
+        traces[1:1] = uncertainty_traces(data)
+    layout = dict(
+        plot_layout,
+        yaxis=dict(plot_layout["yaxis"], range=[0, y_max], title={"text": "Total %s Cost" % interval_str}),
+        yaxis2=dict(plot_layout["yaxis2"], range=[0, data["y_max2"]],
+                    title={"text": "Total %s Stored" % data["units"]}, ticksuffix=data["units"]),
+        xaxis=dict(plot_layout["xaxis"], title={"text": x_title}, ticktext=x_ticklabels, tickvals=x_tickvals),
+    )
+    return {'data': traces, 'layout': layout}
+
+piechart_labels = ["Tier 1 Cost", "Tier 2 Cost", "Reaccess Cost"]
+
+piechart_trace = {
+    "type": "pie",
+    "labels": piechart_labels,
+    "direction": 'clockwise',
+    "sort": False,
+    "textinfo": "percent",
+    "hoverinfo": "none",
+}
+
+piechart_layout = {
+    "margin": dict(l=30,r=10,t=20,b=0),
+    "legend": dict(x=1.3, y=0.8),
+}
 
-@app.callback(
-    Output('piechart', 'figure'),
-    [Input(component_id='data-store', component_property='children')])
 def update_piechart(data):
-    data = json.loads(data)
-    labels = ["Tier 1 Cost", "Tier 2 Cost", "Reaccess Cost"]
     values = [
-        sum(data["tier1_storage_cost_array"]),
-        sum(data["tier2_storage_cost_array"]),
-        sum(data["reaccess_cost_array"])
+        data["totals"]["tier1_storage_cost_array"],
+        data["totals"]["tier2_storage_cost_array"],
+        data["totals"]["reaccess_cost_array"]
     ]
-    traces = [go.Pie(
-        labels=labels, values=values, 
-        direction='clockwise',
-        sort=False,
-        textinfo="percent",
-        hoverinfo="none"
-
-    )]
     return {
-        'data': traces,
-        'layout': go.Layout(
-            margin=dict(l=30,r=10,t=20,b=0),
-            legend=dict(x=1.3, y=0.8)
-        )
+        'data': [dict(piechart_trace, values=values)],
+        'layout': piechart_layout
     }
 
-@app.callback(
-    Output('stats-boxes', 'children'),
-    [Input(component_id='data-store', component_property='children')])
 def update_stats(data):
-    data = json.loads(data)
-    lifetime_cost = int(np.array(data["costs_array"]).sum())
-    total_samples = np.array(data["samples_run_array"]).sum()
+    lifetime_cost = int(data["totals"]["costs_array"])
+    total_samples = data["totals"]["samples_run_array"]
     if total_samples > 0:
         cost_stats = []
         for tt in ["genome", "exome", "panel"]:
@@ -429,10 +474,329 @@ def update_stats(data):
                 cost_stats.append(e)
     else:
         cost_stats = []
-    return [
+    boxes = [
         stat_summary_box("Total lifetime cost: ", '${:,}'.format(lifetime_cost)),
-        stat_summary_box("Average cost per test: ", cost_stats)   
+        stat_summary_box("Average cost per test: ", cost_stats)
     ]
+    if "uncertainty" in data:
+        low, median, high = data["uncertainty"]["lifetime_cost"]
+        boxes.insert(1, stat_summary_box("Lifetime cost P10-P90: ", '${:,.0f} - ${:,.0f}'.format(low, high)))
+    return boxes
+
+@app.callback(
+    Output('export-links', 'children'),
+    [Input(component_id='scenario-store', component_property='children'),
+     Input(component_id='time-interval-setting', component_property='value')]
+)
+def update_export_links(scenario, interval):
+    # downloads of the current scenario, streamed by /export; daily series
+    # are exported by month
+    if not scenario:
+        raise PreventUpdate
+    interval = interval or 1
+
+    def link(label, **args):
+        href = "/export?" + urlencode(dict(args, scenario=scenario, interval=interval))
+        return html.Div(html.A(label, href=href, download=True))
+
+    return [
+        link("Series (CSV)", format="csv", table="series"),
+        link("Summary (CSV)", format="csv", table="summaries"),
+        link("Both (.npz)", format="npz"),
+    ]
+
+@app.callback(
+    Output('pair-comparison', 'children'),
+    [Input(component_id='compare-pairs-button', component_property='n_clicks')],
+    [State(component_id='scenario-store', component_property='children')]
+)
+@metrics.timed("storagecosts_callback_seconds", callback="update_pair_comparison")
+def update_pair_comparison(n_clicks, scenario):
+    if not n_clicks or not scenario:
+        raise PreventUpdate
+    result = compare_storage_pairs(
+        json.loads(scenario),
+        [st["value"] for st in storage_types])
+    labels = [st["label"] for st in storage_types]
+    label_of = dict(zip(result["storage_types"], labels))
+    cost_matrix = result["cost_matrix"]
+
+    tier1_best, tier2_best, best_cost = result["ranking"][0]
+    traces = [go.Heatmap(
+        z=cost_matrix,
+        x=labels,
+        y=labels,
+        text=[["%s, then %s: $%s" % (t1, t2, '{:,.0f}'.format(cost)) for t2, cost in zip(labels, costs)]
+              for t1, costs in zip(labels, cost_matrix)],
+        hoverinfo="text",
+        colorscale="Viridis",
+        reversescale=True,
+        colorbar=dict(tickprefix="$")
+    )]
+    return [
+        html.P("Cheapest: %s, then %s ($%s lifetime)" % (
+            label_of[tier1_best], label_of[tier2_best], '{:,.0f}'.format(best_cost))),
+        dcc.Graph(
+            id='pair-heatmap',
+            config={'displayModeBar': False},
+            style={'width': 800},
+            figure={
+                'data': traces,
+                'layout': go.Layout(
+                    margin=dict(l=200, r=20, t=20, b=160),
+                    height=600,
+                    xaxis=dict(title="Tier 2 storage", fixedrange=True),
+                    yaxis=dict(title="Tier 1 storage", fixedrange=True, autorange="reversed"),
+                )
+            })
+    ]
+
+@app.callback(
+    Output('sensitivity-chart', 'children'),
+    [Input(component_id='sensitivity-button', component_property='n_clicks')],
+    [State(component_id='scenario-store', component_property='children')]
+)
+@metrics.timed("storagecosts_callback_seconds", callback="update_sensitivity")
+def update_sensitivity(n_clicks, scenario):
+    if not n_clicks or not scenario:
+        raise PreventUpdate
+    result = sensitivity_stage(json.loads(scenario), [st["value"] for st in storage_types])
+    return [
+        html.P("Lifetime cost with each input %d%% lower and higher, and with the cheapest and "
+               "priciest storage type for each tier." % round(result["step"] * 100)),
+        dcc.Graph(
+            id='sensitivity-tornado',
+            config={'displayModeBar': False},
+            style={'width': 800},
+            figure=tornado_figure(result))
+    ]
+
+@stage("sensitivity", encode=json.dumps, decode=json.loads)
+def sensitivity_stage(scenario, storage_type_names):
+    return sensitivity(scenario, storage_types=storage_type_names)
+
+def tornado_figure(result):
+    # bars of the change in lifetime cost from the base scenario, largest
+    # swing on top
+    base = result["base"]
+    labels = result["labels"][::-1]
+    low = [v - base for v in result["low"][::-1]]
+    high = [v - base for v in result["high"][::-1]]
+    traces = [
+        go.Bar(y=labels, x=low, orientation='h', name="Lower / cheapest",
+               text=['${:,.0f}'.format(v + base) for v in low], hoverinfo="text+y"),
+        go.Bar(y=labels, x=high, orientation='h', name="Higher / priciest",
+               text=['${:,.0f}'.format(v + base) for v in high], hoverinfo="text+y"),
+    ]
+    return {
+        'data': traces,
+        'layout': go.Layout(
+            barmode="overlay",
+            margin=dict(l=200, r=20, t=20, b=60),
+            height=80 + 40 * len(labels),
+            xaxis=dict(title="Change in lifetime cost from ${:,.0f}".format(base), tickprefix="$",
+                       zeroline=True, fixedrange=True),
+            yaxis=dict(fixedrange=True),
+            legend=dict(orientation="h", y=1.1),
+        )
+    }
+
+@app.callback(
+    Output('split-optimizer', 'children'),
+    [Input(component_id='optimize-split-button', component_property='n_clicks')],
+    [State(component_id='scenario-store', component_property='children')]
+)
+@metrics.timed("storagecosts_callback_seconds", callback="update_split_optimizer")
+def update_split_optimizer(n_clicks, scenario):
+    if not n_clicks or not scenario:
+        raise PreventUpdate
+    scenario = json.loads(scenario)
+    result = split_optimizer_stage(scenario, [st["value"] for st in storage_types])
+    label_of = {st["value"]: st["label"] for st in storage_types}
+    best = result["best"]
+    if best["retention_time_tier2"] == 0:
+        policy = "all %d months in %s" % (best["retention_time_tier1"], label_of[best["tier1_storage_type"]])
+    else:
+        policy = "%d months in %s, then %d months in %s" % (
+            best["retention_time_tier1"], label_of[best["tier1_storage_type"]],
+            best["retention_time_tier2"], label_of[best["tier2_storage_type"]])
+    summary = "Cheapest: %s ($%s lifetime" % (policy, '{:,.0f}'.format(best["lifetime_cost"]))
+    if result["current_cost"] is not None:
+        summary += ", saving $%s" % '{:,.0f}'.format(result["current_cost"] - best["lifetime_cost"])
+    summary += ")"
+
+    traces = [
+        go.Scatter(x=result["splits"], y=result["current_pair_costs"],
+                   name="%s, then %s" % (label_of[scenario["tier1_storage_type"]],
+                                         label_of[scenario["tier2_storage_type"]])),
+        go.Scatter(x=result["splits"], y=result["best_costs"], name="Cheapest storage pair",
+                   line=dict(dash="dash")),
+    ]
+    return [
+        html.P(summary),
+        dcc.Graph(
+            id='split-optimizer-plot',
+            config={'displayModeBar': False},
+            style={'width': 800},
+            figure={
+                'data': traces,
+                'layout': go.Layout(
+                    margin=dict(l=90, r=20, t=20, b=60),
+                    height=400,
+                    xaxis=dict(title="Months in tier 1 (of %d retained)" % result["splits"][-1], fixedrange=True),
+                    yaxis=dict(title="Lifetime cost", tickprefix="$", fixedrange=True),
+                    legend=dict(orientation="h", y=1.1),
+                )
+            })
+    ]
+
+@stage("split-optimizer", encode=json.dumps, decode=json.loads)
+def split_optimizer_stage(scenario, storage_type_names):
+    # every split of the scenario's total retention, for all storage pairs
+    pairs = [(t1, t2) for t1 in storage_type_names for t2 in storage_type_names]
+    result = optimize_retention_split(scenario, pairs)
+    current = pairs.index((scenario["tier1_storage_type"], scenario["tier2_storage_type"]))
+    return {
+        "splits": result["splits"].tolist(),
+        "best": result["best"],
+        "current_cost": result["current_cost"],
+        "current_pair_costs": result["cost_matrix"][current].tolist(),
+        "best_costs": result["best_costs"].tolist(),
+    }
+
+@app.callback(
+    Output('cohort-costs', 'children'),
+    [Input(component_id='cohort-costs-button', component_property='n_clicks')],
+    [State(component_id='scenario-store', component_property='children')]
+)
+@metrics.timed("storagecosts_callback_seconds", callback="update_cohort_costs")
+def update_cohort_costs(n_clicks, scenario):
+    if not n_clicks or not scenario:
+        raise PreventUpdate
+    result = cohort_costs_stage(json.loads(scenario))
+    if not result["months"]:
+        return html.P("No tests are sequenced in this scenario.")
+    return [
+        html.P("Lifetime storage, retrieval and transfer cost of a test by the month it is sequenced in. "
+               "Re-accesses are spread over all stored data, so older data shares them while it is kept."),
+        dcc.Graph(
+            id='cohort-costs-plot',
+            config={'displayModeBar': False},
+            style={'width': 800},
+            figure=cohort_costs_figure(result))
+    ]
+
+@stage("cohort-costs", encode=json.dumps, decode=json.loads)
+def cohort_costs_stage(scenario):
+    result = cohort_costs(scenario)
+    tests = [tt for tt in ["genome", "exome", "panel"] if scenario[tt + "_count"] > 0]
+    # share of each cohort's lifetime cost from storage, retrieval and transfer
+    total = np.where(result["lifetime_cost"] != 0, result["lifetime_cost"], 1.)
+    return {
+        "months": np.arange(len(result["cohort_gb"])).tolist(),
+        "cost_per_test": {tt: result["cost_per_test"][tt].tolist() for tt in tests},
+        "shares": {kind: (result["lifetime"][kind] / total).tolist() for kind in result["lifetime"]},
+    }
+
+def cohort_costs_figure(result):
+    shares = result["shares"]
+    traces = []
+    for tt in [tt for tt in ["genome", "exome", "panel"] if tt in result["cost_per_test"]]:
+        costs = result["cost_per_test"][tt]
+        text = ["%s sequenced in month %d: $%0.2f (%d%% storage, %d%% retrieval, %d%% transfer)" % (
+                    tt.capitalize(), month + 1, cost, round(storage * 100), round(retrieval * 100),
+                    round(transfer * 100))
+                for month, cost, storage, retrieval, transfer in zip(
+                    result["months"], costs, shares["storage_cost"], shares["retrieval_cost"],
+                    shares["transfer_cost"])]
+        traces.append({"type": "scatter", "x": [m + 1 for m in result["months"]], "y": costs,
+                       "text": text, "hoverinfo": "text", "name": tt.capitalize()})
+    return {
+        'data': traces,
+        'layout': {
+            "margin": dict(l=90, r=20, t=20, b=60),
+            "height": 400,
+            "xaxis": dict(title="Month sequenced", fixedrange=True),
+            "yaxis": dict(title="Lifetime cost per test", tickprefix="$", fixedrange=True),
+            "legend": dict(orientation="h", y=1.1),
+        }
+    }
+
+@app.callback(
+    Output('sweep-job', 'data'),
+    [Input(component_id='sweep-button', component_property='n_clicks')],
+    [State(component_id='scenario-store', component_property='children'),
+     State(component_id='sweep-parameter', component_property='value'),
+     State(component_id='sweep-from', component_property='value'),
+     State(component_id='sweep-to', component_property='value'),
+     State(component_id='sweep-steps', component_property='value')]
+)
+@metrics.timed("storagecosts_callback_seconds", callback="submit_sweep")
+def submit_sweep(n_clicks, scenario, parameter, start, stop, steps):
+    # the sweep runs as a background job; only its id and inputs are stored
+    if not n_clicks or not scenario or not steps:
+        raise PreventUpdate
+    scenario = json.loads(scenario)
+    current = scenario[parameter]
+    start = current * 0.5 if start is None else start
+    stop = current * 2 if stop is None else stop
+    values = np.linspace(start, stop, int(min(max(steps, 2), 1000)))
+    if parameter in integer_inputs:
+        values = np.unique(np.round(values))
+    scenarios = [dict(scenario, **{parameter: float(v)}) for v in values]
+    chunks = [scenarios[i:i + sweep_chunk_size] for i in range(0, len(scenarios), sweep_chunk_size)]
+    return {
+        "job_id": job_runner.submit("sweep", chunks),
+        "parameter": parameter,
+        "values": values.tolist(),
+        "current": current,
+    }
+
+@app.callback(
+    [Output('sweep-results', 'children'),
+     Output('sweep-poll', 'disabled')],
+    [Input(component_id='sweep-job', component_property='data'),
+     Input(component_id='sweep-poll', component_property='n_intervals')]
+)
+@metrics.timed("storagecosts_callback_seconds", callback="update_sweep")
+def update_sweep(job, n_intervals):
+    # polled while the job runs; draws the scenarios finished so far
+    if not job:
+        raise PreventUpdate
+    status = job_runner.store.status(job["job_id"])
+    if status is None:
+        return html.P("This sweep has expired, please run it again."), True
+    lifetime_costs = [None] * len(job["values"])
+    for chunk, summaries in job_runner.store.results(job["job_id"]).items():
+        for i, summary in enumerate(summaries):
+            lifetime_costs[chunk * sweep_chunk_size + i] = summary["lifetime_cost"]
+    finished = len([c for c in lifetime_costs if c is not None])
+    if status["status"] == "failed":
+        message = "The sweep failed (%s)." % status["error"]
+    elif status["status"] == "done":
+        message = "Lifetime cost of %d scenarios." % finished
+    else:
+        message = "Finished %d of %d scenarios..." % (finished, len(job["values"]))
+    label = dict(sensitivity_inputs).get(job["parameter"], job["parameter"])
+    return [
+        html.P(message),
+        dcc.Graph(
+            id='sweep-plot',
+            config={'displayModeBar': False},
+            style={'width': 800},
+            figure={
+                'data': [{"type": "scatter", "mode": "lines+markers", "x": job["values"], "y": lifetime_costs,
+                          "name": "Lifetime cost"}],
+                'layout': {
+                    "margin": dict(l=90, r=20, t=20, b=60),
+                    "height": 400,
+                    "xaxis": dict(title=label, fixedrange=True),
+                    "yaxis": dict(title="Lifetime cost", tickprefix="$", fixedrange=True, rangemode="tozero"),
+                    "shapes": [dict(type="line", xref="x", yref="paper", x0=job["current"], x1=job["current"],
+                                    y0=0, y1=1, line=dict(dash="dot", color="gray"))],
+                }
+            })
+    ], status["status"] != "running"
 
 @app.callback(
     Output('control-panel-volumes-custom-pane', 'style'),
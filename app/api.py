@@ -0,0 +1,252 @@
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+from concurrent.futures import Future
+
+from flask import Response, jsonify, request, stream_with_context
+
+from app.cache import canonical_key
+from storagecosts import make_scenario, default_scenario, catalog_version, storage_type_id, bills_egress
+from storagecosts.export import iter_export, formats, tables
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# JSON API for the cost model, for clients that want the numbers without the
+# Dash UI. POST /api/v1/simulate takes one or many scenarios and returns the
+# same payload per scenario as the app's `data-store` (see app/README.md);
+# POST /api/v1/export streams their series and summaries as CSV or a columnar
+# archive, and GET /export does the same for the app's download links.
+# Identical concurrent requests are coalesced: within a worker process the
+# later ones wait for the first and share its response, and across gunicorn
+# workers they wait on a lock file and then find the results in the shared
+# result cache.
+
+# lock files shared by all workers; requests whose keys hash to the same
+# slot are serialized
+lock_slots = 256
+
+text_fields = ["tier1_storage_type", "tier2_storage_type", "reaccess_target"]
+
+# numeric fields must be finite, at least 0 (or their minimum below) and at
+# most these values (the default for fields not listed), which keeps every
+# result finite and the simulated horizon small enough to answer in one
+# request; month counts must be integers
+max_months = 12 * 200
+field_limits = {
+    "months": max_months,
+    "total_years_simulated": max_months / 12,
+    "retention_time_tier1": max_months,
+    "retention_time_tier2": max_months,
+    "volume_growth": 100,
+}
+default_limit = 1e12
+field_minimums = {
+    "retention_time_tier1": 1,
+}
+integer_fields = ["months", "retention_time_tier1", "retention_time_tier2"]
+
+intervals = (0, 1, 3, 6, 12)
+
+
+class Coalescer(object):
+    # runs one computation per key at a time; callers with a key that is
+    # already being computed wait for that result instead
+
+    def __init__(self, lock_dir=None):
+        self.lock = threading.Lock()
+        self.running = {}
+        self.lock_dir = lock_dir
+
+    def run(self, key, compute):
+        # returns (result, whether it came from another caller's computation)
+        with self.lock:
+            future = self.running.get(key)
+            leader = future is None
+            if leader:
+                future = self.running[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            with self.process_lock(key):
+                result = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.running[key]
+        future.set_result(result)
+        return result, False
+
+    def process_lock(self, key):
+        if self.lock_dir is None or fcntl is None:
+            return _NoLock()
+        slot = int(hashlib.sha1(key.encode("utf-8")).hexdigest(), 16) % lock_slots
+        return _FileLock(os.path.join(self.lock_dir, "storagecosts-api-%d.lock" % slot))
+
+
+class _FileLock(object):
+
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.f = open(self.path, "a")
+        fcntl.flock(self.f, fcntl.LOCK_EX)
+
+    def __exit__(self, exc_type, exc, tb):
+        fcntl.flock(self.f, fcntl.LOCK_UN)
+        self.f.close()
+
+
+class _NoLock(object):
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+def checked_value(field, value):
+    if field in text_fields:
+        if not isinstance(value, str):
+            raise ValueError("`%s` must be a string" % field)
+        return
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError("`%s` must be a number" % field)
+    if field in integer_fields and not isinstance(value, int):
+        raise ValueError("`%s` must be a whole number of months" % field)
+    minimum = field_minimums.get(field, 0)
+    limit = field_limits.get(field, default_limit)
+    if not math.isfinite(value) or not minimum <= value <= limit:
+        raise ValueError("`%s` must be between %g and %g" % (field, minimum, limit))
+
+def checked_scenario(values):
+    for field, value in values.items():
+        # make_scenario rejects unknown fields
+        if field in default_scenario or field == "total_years_simulated":
+            checked_value(field, value)
+    scenario = make_scenario(**values)
+    # `months` is derived from the other fields when it isn't given
+    checked_value("months", scenario["months"])
+    storage_type_id(scenario["tier1_storage_type"])
+    storage_type_id(scenario["tier2_storage_type"])
+    bills_egress(scenario["reaccess_target"])
+    return scenario
+
+def parse_request(body, max_scenarios):
+    # (scenarios, interval, body) from a request body, or ValueError
+    if not isinstance(body, dict):
+        raise ValueError("expected a JSON object")
+    if "scenarios" in body:
+        values = body["scenarios"]
+        if not isinstance(values, list):
+            raise ValueError("`scenarios` must be a list")
+    else:
+        values = [body.get("scenario", {})]
+    if len(values) > max_scenarios:
+        raise ValueError("at most %d scenarios per request" % max_scenarios)
+    scenarios = []
+    for i, v in enumerate(values):
+        if not isinstance(v, dict):
+            raise ValueError("scenario %d is not an object" % i)
+        try:
+            scenarios.append(checked_scenario(v))
+        except (TypeError, ValueError) as e:
+            raise ValueError("scenario %d: %s" % (i, e))
+    interval = body.get("interval", 1)
+    if isinstance(interval, bool) or not isinstance(interval, int) or interval not in intervals:
+        raise ValueError("`interval` must be 0 (daily), 1, 3, 6 or 12 months")
+    return scenarios, interval, body
+
+def parse_simulate_request(body, max_scenarios):
+    scenarios, interval, body = parse_request(body, max_scenarios)
+    columns = body.get("columns", "base64")
+    if columns not in ("base64", "lists"):
+        raise ValueError("`columns` must be \"base64\" or \"lists\"")
+    return scenarios, interval, columns
+
+def parse_export_request(body, max_scenarios):
+    # (scenarios as (name, scenario), interval, format, table); series are
+    # exported monthly or coarser
+    scenarios, interval, body = parse_request(body, max_scenarios)
+    names = body.get("names") or [str(i) for i in range(len(scenarios))]
+    if not isinstance(names, list) or len(names) != len(scenarios):
+        raise ValueError("`names` must be a list with one name per scenario")
+    if interval == 0:
+        raise ValueError("exports are monthly or coarser (`interval` 1, 3, 6 or 12)")
+    export_format = body.get("format", "csv")
+    if export_format not in formats:
+        raise ValueError("`format` must be one of %s" % ", ".join(formats))
+    table = body.get("table", "summaries")
+    if table not in tables:
+        raise ValueError("`table` must be one of %s" % ", ".join(tables))
+    return list(zip([str(n) for n in names], scenarios)), interval, export_format, table
+
+def export_response(scenarios, interval, export_format, table):
+    # streamed as each chunk of scenarios is simulated
+    if export_format == "csv":
+        filename, mimetype = "storagecosts-%s.csv" % table, "text/csv"
+    else:
+        filename, mimetype = "storagecosts.npz", "application/zip"
+    chunks = iter_export(scenarios, export_format, table, interval)
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={"Content-Disposition": "attachment; filename=%s" % filename})
+
+def register_api(server, metrics, payloads, unpack_columns, max_scenarios=None):
+    # `payloads(scenarios, interval)` gives the data-store payloads of a
+    # batch of scenarios; `unpack_columns` decodes a payload's columns
+    if max_scenarios is None:
+        max_scenarios = int(os.environ.get("STORAGECOSTS_API_MAX_SCENARIOS", 1000))
+    coalescer = Coalescer(tempfile.gettempdir())
+
+    @server.route("/api/v1/simulate", methods=["POST"])
+    def simulate_api():
+        try:
+            scenarios, interval, columns = parse_simulate_request(request.get_json(force=True, silent=True),
+                                                                  max_scenarios)
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        key = canonical_key(catalog_version, "api", scenarios, interval)
+        with metrics.timer("storagecosts_api_seconds", coalesced="no") as timer:
+            results, coalesced = coalescer.run(key, lambda: payloads(scenarios, interval))
+            timer.labels["coalesced"] = "yes" if coalesced else "no"
+        metrics.observe("storagecosts_api_scenarios", len(scenarios))
+        if columns == "lists":
+            results = [dict(p, columns={k: v.tolist() for k, v in unpack_columns(p["columns"]).items()})
+                       for p in results]
+        return jsonify(catalog_version=catalog_version, scenarios=scenarios, results=results)
+
+    @server.route("/api/v1/export", methods=["POST"])
+    def export_api():
+        try:
+            request_args = parse_export_request(request.get_json(force=True, silent=True), max_scenarios)
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        metrics.observe("storagecosts_api_scenarios", len(request_args[0]))
+        return export_response(*request_args)
+
+    @server.route("/export")
+    def export_download():
+        # download links in the app: one scenario as query parameters
+        try:
+            body = {
+                "scenario": json.loads(request.args.get("scenario", "{}")),
+                "interval": int(request.args.get("interval", 1)),
+                "format": request.args.get("format", "csv"),
+                "table": request.args.get("table", "series"),
+                "names": ["scenario"],
+            }
+            request_args = parse_export_request(body, 1)
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        return export_response(*request_args)
+
+    return coalescer
@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+def canonical_key(*parts):
+    # stable key for json-like values: numbers are compared by value so that
+    # e.g. 24 months and 24.0 months hit the same entry
+    def canonical(o):
+        if isinstance(o, bool) or o is None or isinstance(o, str):
+            return o
+        if isinstance(o, (int, float)):
+            return float(o)
+        if isinstance(o, dict):
+            return {str(k): canonical(v) for k, v in o.items()}
+        if isinstance(o, (list, tuple)):
+            return [canonical(v) for v in o]
+        return canonical(o.item()) if hasattr(o, "item") else str(o)
+
+    text = json.dumps([canonical(p) for p in parts], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class ResultCache(object):
+    # Bounded LRU/TTL cache of serialized results in a local sqlite file, so
+    # that all worker processes on a host share entries and hit/miss counters.
+    # A `max_entries` of 0 disables the cache.
+    #
+    # Reads are kept off the sqlite write lock: a hit only rewrites its
+    # `accessed` time when that is older than `touch_interval` seconds, and
+    # hits and misses are counted in memory and added to the shared counters
+    # every `flush_every` lookups (and by stats()). Entries beyond the bound
+    # are evicted in batches, after every `max_entries // 16` stores, so the
+    # cache may briefly hold a few more than `max_entries`.
+
+    flush_every = 100
+
+    def __init__(self, path, max_entries=512, ttl=24 * 3600, touch_interval=60):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.touch_interval = min(touch_interval, ttl)
+        self.evict_every = max(1, max_entries // 16)
+        self.counts = {"hits": 0, "misses": 0}
+        self.stores = 0
+        # guards counts and stores, which threads of a worker share
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        if self.enabled:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS results "
+                             "(key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL)")
+                conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+                conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+                conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _connect(self):
+        # one connection per thread, reopened in forked workers; commits (or
+        # rolls back) on exit but stays open
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            # a lost write after a power cut only costs a recomputation
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn, self.local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            row = conn.execute("SELECT value, created, accessed FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                # expired entries are left for the next eviction
+                row = None
+            elif row is not None and now - row[2] > self.touch_interval:
+                conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        self._count("misses" if row is None else "hits")
+        return None if row is None else row[0]
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self.lock:
+            self.stores += 1
+            evict = self.stores % self.evict_every == 0
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (key, value, now, now))
+            if evict:
+                self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        # expired entries, then least recently used ones beyond the bound
+        conn.execute("DELETE FROM results WHERE created < ?", (now - self.ttl,))
+        conn.execute("DELETE FROM results WHERE accessed < "
+                     "(SELECT accessed FROM results ORDER BY accessed DESC LIMIT 1 OFFSET ?)",
+                     (self.max_entries - 1,))
+
+    def _count(self, name):
+        with self.lock:
+            self.counts[name] += 1
+            due = self.counts["hits"] + self.counts["misses"] >= self.flush_every
+        if due:
+            self.flush()
+
+    def flush(self):
+        # add this process's hit/miss counts to the shared counters
+        with self.lock:
+            counts = [(n, name) for name, n in self.counts.items() if n]
+            self.counts = {"hits": 0, "misses": 0}
+        if not self.enabled or not counts:
+            return
+        with self._connect() as conn:
+            conn.executemany("UPDATE counters SET value = value + ? WHERE name = ?", counts)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counts = {"hits": 0, "misses": 0}
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results")
+            conn.execute("UPDATE counters SET value = 0")
+
+    def stats(self):
+        if not self.enabled:
+            return {"hits": 0, "misses": 0, "entries": 0}
+        self.flush()
+        with self._connect() as conn:
+            stats = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            stats["entries"] = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return stats
+
+
+class _Connection(object):
+    # sqlite connection that commits and closes on exit; connections are
+    # opened per operation so they are never shared across forked workers
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=10)
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self.conn.close()
+
+
+def default_cache():
+    # configured through the environment so all gunicorn workers agree
+    path = os.environ.get("STORAGECOSTS_CACHE_PATH",
+                          os.path.join(tempfile.gettempdir(), "storagecosts-cache.sqlite"))
+    max_entries = int(os.environ.get("STORAGECOSTS_CACHE_SIZE", 512))
+    ttl = float(os.environ.get("STORAGECOSTS_CACHE_TTL", 24 * 3600))
+    return ResultCache(path, max_entries=max_entries, ttl=ttl)
@@ -88,7 +88,7 @@ control_panel = [
                     options=storage_types,
                     value='S3', clearable=False, multi=False, className='border-bottom-input', style={"width": "200px", "display": "inline-block"}),
                 " for ", 
-                dcc.Input(id='retention-time-tier1', className='border-bottom', min=0, value=2, type='number'),
+                dcc.Input(id='retention-time-tier1', className='border-bottom', min=1, value=2, type='number'),
                 dcc.Dropdown(
                     id='retention-time-tier1-units',
                     options=[
@@ -131,14 +131,17 @@ control_panel = [
                         dcc.Input(id='volume-growth', className='border-bottom', min=0, max=100, value=5, type='number'),
                         " percent per year."]),
             row(["Simulate ",
-                 dcc.Input(id='total-years-simulated', className='border-bottom', min=0, max=25, value=15, type='number'),
+                 dcc.Input(id='total-years-simulated', className='border-bottom', min=0, max=100, value=15, type='number'),
                  " years total."
                 ]),
             row(["Plot data in  ",
                  dcc.Dropdown(
                         id='time-interval-setting', 
                         options=[
+                            {'label': "daily", 'value': 0},
                             {'label': "monthly", 'value': 1},
+                            {'label': "quarterly", 'value': 3},
+                            {'label': "half-yearly", 'value': 6},
                             {'label': "yearly", 'value': 12},
                         ], value=12, clearable=False, multi=False, 
                         className='border-bottom-input',
@@ -146,5 +149,19 @@ control_panel = [
                 " intervals."
                 ])
         ])
+    ]),
+    panel(title="5. Uncertainty", children=[
+        container([
+            row(["Simulate ",
+                 dcc.Input(id='uncertainty-trials', className='border-bottom', min=0, max=10000, step=100, value=0, type='number'),
+                 " random scenarios ", html.Span("(0 to disable)", className='text-muted', style={'fontSize': "14px"}), "."]),
+            row(["Volume growth varies by ",
+                 dcc.Input(id='uncertainty-growth-sd', className='border-bottom', min=0, value=2, type='number'),
+                 " percentage points, re-access by ",
+                 dcc.Input(id='uncertainty-reaccess-sd', className='border-bottom', min=0, value=25, type='number'),
+                 " percent and file sizes by ",
+                 dcc.Input(id='uncertainty-size-sd', className='border-bottom', min=0, value=10, type='number'),
+                 " percent (standard deviations)."])
+        ])
     ])
 ]
@@ -3,6 +3,11 @@ import dash_core_components as dcc
 import dash_html_components as html
 
 from app.components.helpers import row, col, container, panel, stat_summary_box, well
+from storagecosts.sensitivity import sensitivity_inputs
+
+# inputs that can be swept (file compression is picked from a fixed list)
+sweep_parameters = [{"label": label, "value": parameter} for parameter, label in sensitivity_inputs
+                    if parameter != "compression"]
 
 output_panel = [
     html.Div(stat_summary_box(
@@ -21,9 +26,59 @@ output_panel = [
             ))
         ]),
         col("col-md-3", [
-            html.Div(
-            )
+            html.Div(stat_summary_box(
+                "Export",
+                html.Div(id='export-links', style={"fontSize": 14})
+            ))
         ])
-    ])
-    
+    ]),
+    html.Div(stat_summary_box(
+        "Compare storage pairs",
+        [
+            html.Button("Compare all storage pairs", id='compare-pairs-button', className='btn btn-default'),
+            html.Div(id='pair-comparison')
+        ]
+    )),
+    html.Div(stat_summary_box(
+        "Sensitivity",
+        [
+            html.Button("Which inputs matter most?", id='sensitivity-button', className='btn btn-default'),
+            html.Div(id='sensitivity-chart')
+        ]
+    )),
+    html.Div(stat_summary_box(
+        "Retention split",
+        [
+            html.Button("Find the best tier 1 / tier 2 split", id='optimize-split-button',
+                        className='btn btn-default'),
+            html.Div(id='split-optimizer')
+        ]
+    )),
+    html.Div(stat_summary_box(
+        "Cost per test by cohort",
+        [
+            html.Button("What does a test sequenced each month cost?", id='cohort-costs-button',
+                        className='btn btn-default'),
+            html.Div(id='cohort-costs')
+        ]
+    )),
+    html.Div(stat_summary_box(
+        "Parameter sweep",
+        [
+            row([
+                dcc.Dropdown(id='sweep-parameter', options=sweep_parameters, value=sweep_parameters[0]["value"],
+                             clearable=False, className='border-bottom-input',
+                             style={"width": "260px", "display": "inline-block"}),
+                " from ", dcc.Input(id='sweep-from', className='border-bottom', type='number', placeholder="half"),
+                " to ", dcc.Input(id='sweep-to', className='border-bottom', type='number', placeholder="double"),
+                " in ", dcc.Input(id='sweep-steps', className='border-bottom', type='number', min=2, max=1000,
+                                  value=50),
+                " steps ",
+                html.Button("Run sweep", id='sweep-button', className='btn btn-default'),
+            ]),
+            dcc.Store(id='sweep-job'),
+            dcc.Interval(id='sweep-poll', interval=1000, disabled=True),
+            html.Div(id='sweep-results')
+        ]
+    ))
 ]
\ No newline at end of file
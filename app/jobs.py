@@ -0,0 +1,206 @@
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.cache import _Connection
+from storagecosts import simulate, summarize
+
+# Batches too big for one callback (parameter sweeps, many scenarios) run as
+# jobs: the batch is split into chunks that run in a local process pool, out
+# of the request path, and each finished chunk's result is written to a
+# sqlite store shared by all gunicorn workers. The UI polls the store and
+# renders whatever has finished so far. Pool processes run at a lower CPU
+# priority so that interactive callbacks stay fast while jobs run.
+
+# scenarios per chunk of a sweep
+sweep_chunk_size = 10
+
+
+def sweep_chunk(scenarios):
+    return [summarize(simulate(scenario)) for scenario in scenarios]
+
+# error of jobs failed for going stale; a later result revives them
+stale_prefix = "no progress for "
+
+# kind -> function of one chunk's payload, returning a json-able result
+job_kinds = {
+    "sweep": sweep_chunk,
+}
+
+
+class JobStore(object):
+    # Job progress and chunk results in a local sqlite file. A job is done
+    # when all its chunks have a result, or failed as soon as one fails. The
+    # runner that owns a job touches its `updated` time while any of its
+    # chunks are queued or running, so a running job that hasn't been
+    # touched for `stale_after` seconds has lost its runner (e.g. the
+    # gunicorn worker was restarted) and is marked failed when its status is
+    # next read. A result that still arrives later revives it.
+
+    def __init__(self, path, ttl=24 * 3600, stale_after=300):
+        self.path = path
+        self.ttl = ttl
+        self.stale_after = stale_after
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT, status TEXT, "
+                         "total INTEGER, completed INTEGER, error TEXT, created REAL, updated REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS chunks "
+                         "(job_id TEXT, chunk INTEGER, result TEXT, PRIMARY KEY (job_id, chunk))")
+
+    def _connect(self):
+        return _Connection(self.path)
+
+    def create(self, kind, total):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            # forget old jobs while we're here
+            old = [row[0] for row in conn.execute("SELECT id FROM jobs WHERE updated < ?", (now - self.ttl,))]
+            conn.executemany("DELETE FROM chunks WHERE job_id = ?", [(i,) for i in old])
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in old])
+            conn.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, 0, NULL, ?, ?)",
+                         (job_id, kind, "running" if total else "done", total, now, now))
+        return job_id
+
+    def add_result(self, job_id, chunk, result):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)", (job_id, chunk, json.dumps(result)))
+            conn.execute("UPDATE jobs SET completed = (SELECT COUNT(*) FROM chunks WHERE job_id = ?), "
+                         "updated = ? WHERE id = ?", (job_id, time.time(), job_id))
+            conn.execute("UPDATE jobs SET status = CASE WHEN completed = total THEN 'done' ELSE 'running' END, "
+                         "error = NULL WHERE id = ? AND (status = 'running' OR (status = 'failed' AND error LIKE ?))",
+                         (job_id, stale_prefix + "%"))
+
+    def touch(self, job_ids):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany("UPDATE jobs SET updated = ? WHERE id = ?", [(now, i) for i in job_ids])
+
+    def fail(self, job_id, error):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                         (error, time.time(), job_id))
+
+    def status(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT kind, status, total, completed, error, updated FROM jobs WHERE id = ?",
+                               (job_id,)).fetchone()
+        if row is None:
+            return None
+        status = dict(zip(["kind", "status", "total", "completed", "error"], row))
+        if status["status"] == "running" and time.time() - row[5] > self.stale_after:
+            status["status"] = "failed"
+            status["error"] = stale_prefix + "%g seconds, its worker may have been restarted" % self.stale_after
+            with self._connect() as conn:
+                conn.execute("UPDATE jobs SET status = ?, error = ? WHERE id = ? AND status = 'running'",
+                             (status["status"], status["error"], job_id))
+        return status
+
+    def results(self, job_id):
+        # {chunk: result} of the chunks finished so far
+        with self._connect() as conn:
+            rows = conn.execute("SELECT chunk, result FROM chunks WHERE job_id = ?", (job_id,)).fetchall()
+        return {chunk: json.loads(result) for chunk, result in rows}
+
+
+def run_chunk(store_path, job_id, chunk, kind, payload):
+    # runs in a pool process; results and failures go straight to the store
+    store = JobStore(store_path)
+    try:
+        result = job_kinds[kind](payload)
+    except Exception as e:
+        store.fail(job_id, "%s: %s" % (type(e).__name__, e))
+        return
+    store.add_result(job_id, chunk, result)
+
+def lower_priority(niceness):
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+
+
+class JobRunner(object):
+    # Submits jobs to a process pool owned by this (gunicorn worker) process.
+    # The pool is started on first use, so forked workers each get their own;
+    # a pool that breaks (a process died, e.g. killed for memory) is replaced
+    # for the next submission. While chunks are queued or running, a
+    # heartbeat thread touches their jobs every `stale_after / 4` seconds.
+
+    def __init__(self, store, processes=1, niceness=10):
+        self.store = store
+        self.processes = processes
+        self.niceness = niceness
+        self.pool = None
+        # reentrant: a future that has already failed runs its callback
+        # straight away, inside submit
+        self.lock = threading.RLock()
+        # job id -> chunks not finished yet
+        self.pending = {}
+        self.heartbeat = None
+
+    def _pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.processes, initializer=lower_priority,
+                                            initargs=(self.niceness,))
+        return self.pool
+
+    def _beat(self):
+        while True:
+            time.sleep(self.store.stale_after / 4.)
+            with self.lock:
+                job_ids = list(self.pending)
+                if not job_ids:
+                    self.heartbeat = None
+                    return
+            self.store.touch(job_ids)
+
+    def submit(self, kind, chunks):
+        # start a job over a list of chunk payloads; returns its id
+        if kind not in job_kinds:
+            raise ValueError("unknown job kind %r" % (kind,))
+        job_id = self.store.create(kind, len(chunks))
+        if not chunks:
+            return job_id
+
+        def check(pool, future):
+            # chunks report their own errors; this catches the pool failing
+            exception = None if future.cancelled() else future.exception()
+            if exception is not None:
+                self.store.fail(job_id, repr(exception))
+            with self.lock:
+                self.pending[job_id] -= 1
+                if not self.pending[job_id]:
+                    del self.pending[job_id]
+                if isinstance(exception, BrokenProcessPool) and self.pool is pool:
+                    self.pool = None
+
+        with self.lock:
+            self.pending[job_id] = len(chunks)
+            for i, payload in enumerate(chunks):
+                try:
+                    pool = self._pool()
+                    future = pool.submit(run_chunk, self.store.path, job_id, i, kind, payload)
+                except BrokenProcessPool:
+                    self.pool = None
+                    pool = self._pool()
+                    future = pool.submit(run_chunk, self.store.path, job_id, i, kind, payload)
+                future.add_done_callback(functools.partial(check, pool))
+            if self.heartbeat is None:
+                self.heartbeat = threading.Thread(target=self._beat, daemon=True)
+                self.heartbeat.start()
+        return job_id
+
+
+def default_runner():
+    # configured through the environment so all gunicorn workers agree
+    path = os.environ.get("STORAGECOSTS_JOBS_PATH", os.path.join(tempfile.gettempdir(), "storagecosts-jobs.sqlite"))
+    processes = int(os.environ.get("STORAGECOSTS_JOB_PROCESSES", 1))
+    niceness = int(os.environ.get("STORAGECOSTS_JOB_NICENESS", 10))
+    stale_after = float(os.environ.get("STORAGECOSTS_JOB_STALE_AFTER", 300))
+    return JobRunner(JobStore(path, stale_after=stale_after), processes, niceness)
@@ -0,0 +1,236 @@
+import functools
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app.cache import _Connection
+
+slow_request_log = logging.getLogger("storagecosts.slow_requests")
+
+seconds_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+bytes_buckets = (1e3, 1e4, 3e4, 1e5, 3e5, 1e6, 3e6, 1e7, 3e7)
+count_buckets = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# name: (help, buckets)
+histograms = {
+    "storagecosts_request_seconds": ("Wall time of Dash callback requests, including JSON encoding", seconds_buckets),
+    "storagecosts_response_bytes": ("Size of Dash callback responses", bytes_buckets),
+    "storagecosts_callback_seconds": ("Wall time of callback functions", seconds_buckets),
+    "storagecosts_stage_seconds": ("Wall time of computation stages, including the stages they call", seconds_buckets),
+    "storagecosts_encode_seconds": ("Time to serialize stage results for the cache and the browser", seconds_buckets),
+    "storagecosts_stage_bytes": ("Size of serialized stage results", bytes_buckets),
+    "storagecosts_figure_seconds": ("Time to build each output figure", seconds_buckets),
+    "storagecosts_api_seconds": ("Wall time of API requests, by whether they waited on an identical request",
+                                 seconds_buckets),
+    "storagecosts_api_scenarios": ("Scenarios per API request", count_buckets),
+}
+
+
+class Metrics(object):
+    # Histograms shared by all worker processes on a host: observations are
+    # aggregated in memory and added to a sqlite file at most every
+    # `flush_interval` seconds (and whenever /metrics is read), so recording
+    # stays cheap and any worker can serve the totals. An empty `path`
+    # disables recording. Values kept elsewhere (e.g. the result cache's
+    # counters) are added to /metrics through register().
+
+    def __init__(self, path, flush_interval=5.):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.pending = {}
+        self.collectors = []
+        self.lock = threading.Lock()
+        self.last_flush = time.time()
+        if self.enabled:
+            with _Connection(self.path) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("CREATE TABLE IF NOT EXISTS histograms "
+                             "(name TEXT, labels TEXT, buckets TEXT, sum REAL, count INTEGER, "
+                             "PRIMARY KEY (name, labels))")
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        buckets = histograms[name][1]
+        key = (name, json.dumps(labels, sort_keys=True))
+        with self.lock:
+            counts, total, count = self.pending.get(key) or ([0] * len(buckets), 0., 0)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.pending[key] = (counts, total + value, count + 1)
+            due = time.time() - self.last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def register(self, collect):
+        # `collect()` returns (name, type, help, value) samples, read every
+        # time /metrics is rendered
+        self.collectors.append(collect)
+
+    def timer(self, name, **labels):
+        return _Timer(self, name, labels)
+
+    def timed(self, name, **labels):
+        # decorator recording the wall time of every call
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.time()
+        if not pending:
+            return
+        try:
+            with _Connection(self.path) as conn:
+                for (name, labels), (counts, total, count) in pending.items():
+                    row = conn.execute("SELECT buckets, sum, count FROM histograms WHERE name = ? AND labels = ?",
+                                       (name, labels)).fetchone()
+                    if row is not None:
+                        counts = [a + b for a, b in zip(counts, json.loads(row[0]))]
+                        total, count = total + row[1], count + row[2]
+                    conn.execute("INSERT OR REPLACE INTO histograms VALUES (?, ?, ?, ?, ?)",
+                                 (name, labels, json.dumps(counts), total, count))
+        except sqlite3.Error:
+            # metrics must never fail a request; these observations are lost
+            logging.getLogger(__name__).exception("could not record metrics")
+
+    def collect(self):
+        # {(name, labels json): (cumulative bucket counts, sum, count)}
+        if not self.enabled:
+            return {}
+        self.flush()
+        with _Connection(self.path) as conn:
+            rows = conn.execute("SELECT name, labels, buckets, sum, count FROM histograms").fetchall()
+        return {(name, labels): (json.loads(counts), total, count) for name, labels, counts, total, count in rows}
+
+    def render(self):
+        # Prometheus text exposition format
+        collected = self.collect()
+        lines = []
+        for name in sorted(histograms):
+            help_text, buckets = histograms[name]
+            lines.append("# HELP %s %s" % (name, help_text))
+            lines.append("# TYPE %s histogram" % name)
+            for (metric, labels), (counts, total, count) in sorted(collected.items()):
+                if metric != name:
+                    continue
+                labels = json.loads(labels)
+                for bound, n in zip(buckets, counts):
+                    lines.append("%s_bucket%s %d" % (name, format_labels(labels, le=format_value(bound)), n))
+                lines.append("%s_bucket%s %d" % (name, format_labels(labels, le="+Inf"), count))
+                lines.append("%s_sum%s %s" % (name, format_labels(labels), format_value(total)))
+                lines.append("%s_count%s %d" % (name, format_labels(labels), count))
+        for collect in self.collectors:
+            for name, kind, help_text, value in collect():
+                lines.append("# HELP %s %s" % (name, help_text))
+                lines.append("# TYPE %s %s" % (name, kind))
+                lines.append("%s %s" % (name, format_value(value)))
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self.lock:
+            self.pending = {}
+        if self.enabled:
+            with _Connection(self.path) as conn:
+                conn.execute("DELETE FROM histograms")
+
+
+class _Timer(object):
+
+    def __init__(self, metrics, name, labels):
+        self.metrics, self.name, self.labels = metrics, name, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.start
+        self.metrics.observe(self.name, self.elapsed, **self.labels)
+
+
+def format_value(v):
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+def format_labels(labels, **extra):
+    labels = dict(labels, **extra)
+    if not labels:
+        return ""
+    escape = lambda v: str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{%s}" % ",".join('%s="%s"' % (k, escape(v)) for k, v in sorted(labels.items()))
+
+
+def instrument_server(server, metrics, slow_request_seconds=None, outputs=()):
+    # time every Dash callback request by its output, record response sizes,
+    # serve /metrics, and log requests slower than `slow_request_seconds`
+    # together with the inputs that caused them. The output comes from the
+    # request body, so only those in `outputs` (checked at request time, e.g.
+    # the Dash app's callback_map) are used as labels and any other is
+    # recorded as "other", which keeps the number of series bounded.
+    from flask import Response, g, request
+
+    @server.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def record_request(response):
+        if not request.path.endswith("/_dash-update-component") or "metrics_start" not in g:
+            return response
+        elapsed = time.perf_counter() - g.metrics_start
+        body = request.get_json(silent=True) or {}
+        output = body.get("output")
+        if not isinstance(output, str) or output not in outputs:
+            output = "other"
+        metrics.observe("storagecosts_request_seconds", elapsed, output=output)
+        if response.content_length is not None:
+            metrics.observe("storagecosts_response_bytes", response.content_length, output=output)
+        if slow_request_seconds is not None and elapsed >= slow_request_seconds:
+            slow_request_log.warning("slow request: %.3fs for %s, inputs %s", elapsed, output,
+                                     json.dumps(body.get("inputs"), sort_keys=True))
+        return response
+
+    @server.route("/metrics")
+    def serve_metrics():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+def cache_samples(cache):
+    # collector for Metrics.register reporting a ResultCache's shared counters
+    def collect():
+        stats = cache.stats()
+        return [
+            ("storagecosts_cache_hits_total", "counter", "Result cache hits in all workers", stats["hits"]),
+            ("storagecosts_cache_misses_total", "counter", "Result cache misses in all workers", stats["misses"]),
+            ("storagecosts_cache_entries", "gauge", "Entries held in the result cache", stats["entries"]),
+        ]
+    return collect
+
+
+def default_metrics():
+    # configured through the environment like the result cache; set
+    # STORAGECOSTS_METRICS_PATH to an empty string to disable recording
+    path = os.environ.get("STORAGECOSTS_METRICS_PATH",
+                          os.path.join(tempfile.gettempdir(), "storagecosts-metrics.sqlite"))
+    flush_interval = float(os.environ.get("STORAGECOSTS_METRICS_FLUSH", 5))
+    return Metrics(path, flush_interval=flush_interval)
+
+def slow_request_threshold():
+    # seconds, from STORAGECOSTS_SLOW_REQUEST_MS; unset disables the log
+    ms = os.environ.get("STORAGECOSTS_SLOW_REQUEST_MS")
+    return float(ms) / 1000. if ms else None
@@ -0,0 +1,234 @@
+"""Benchmarks for the pricing, simulation and rendering hot paths.
+
+    python benchmarks/run.py -o before.json
+    python benchmarks/run.py -o after.json
+    python benchmarks/run.py --compare before.json after.json
+
+Each case is timed over several repeats; results are saved as JSON with
+min/median/p95 per call in milliseconds, along with the environment.
+"""
+import argparse
+import functools
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+# time the computation itself, not the shared result cache
+os.environ.setdefault("STORAGECOSTS_CACHE_SIZE", "0")
+os.environ.setdefault("STORAGECOSTS_METRICS_PATH", "")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import plotly
+
+import storagecosts
+from storagecosts.montecarlo import percentile_bands
+from storagecosts.fleet import simulate_fleet
+from storagecosts.objects import simulate_objects
+import app
+from app.cache import ResultCache, canonical_key
+
+cases = []
+
+
+def control_panel_values(years, tier1_storage_type, tier2_storage_type):
+    return (True, 0, 0, 0, 500, 2000, 5000, 120, 6, 1, "BAM", 2, "years", 3,
+            tier1_storage_type, tier2_storage_type, 5, years, 100, "internet")
+
+horizons = [1, 5, 15, 25]
+intervals = [0, 1, 12]
+tier_pairs = [("S3", "glacier"), ("azure_lrs_hot", "azure_lrs_archive"), ("gcp_regional", "gcp_archive")]
+
+
+def pricing_cases():
+    # curves are compiled once when the catalog loads, so evaluation and
+    # compilation are timed separately
+    amounts = np.linspace(0, 2e6, 300)
+    for table_name, table in [("storage", storagecosts.storage_cost_buckets),
+                              ("transfer", storagecosts.transfer_cost_buckets)]:
+        for bucket_name, buckets in table.items():
+            curve = storagecosts.compile_cost_buckets(buckets)
+            prefix = "calc_cost_curve/%s/%s" % (table_name, bucket_name)
+            cases.append((prefix + "/scalar", functools.partial(storagecosts.calc_cost_curve, curve, 123456.)))
+            cases.append((prefix + "/array300", functools.partial(storagecosts.calc_cost_curve, curve, amounts)))
+            cases.append(("compile_cost_buckets/%s/%s" % (table_name, bucket_name),
+                          functools.partial(storagecosts.compile_cost_buckets, buckets)))
+
+
+def simulation_cases():
+    for years in horizons:
+        for interval in intervals:
+            for tier1, tier2 in tier_pairs:
+                values = control_panel_values(years, tier1, tier2) + (interval,)
+                cases.append(("do_calculation/%dy/interval%d/%s-%s" % (years, interval, tier1, tier2),
+                              functools.partial(app.do_calculation, *values)))
+
+
+def resample_cases():
+    for length in [12, 300, 9000]:
+        a = np.random.rand(length)
+        for interval in [1, 3, 12]:
+            for how in ["sum", "max"]:
+                cases.append(("resample/%d/interval%d/%s" % (length, interval, how),
+                              functools.partial(storagecosts.resample, a, interval, how)))
+
+
+def montecarlo_cases():
+    distributions = {"volume_growth": ("normal", 5, 2), "reaccess_count": ("normal", 100, 25),
+                     "compression": ("normal", 1, 0.1)}
+    for years in [15, 25]:
+        scenario = storagecosts.normalize_inputs(*control_panel_values(years, "S3", "glacier"))
+        for trials in [1000, 10000]:
+            cases.append(("montecarlo/%dy/%dtrials" % (years, trials),
+                          functools.partial(percentile_bands, scenario, distributions, trials, interval=12)))
+
+
+def fleet_cases():
+    storage_types = list(storagecosts.pricing["storage_types"])
+    for count in [100, 500]:
+        labs = []
+        for i in range(count):
+            scenario = storagecosts.normalize_inputs(*control_panel_values(
+                25, storage_types[i % len(storage_types)], storage_types[i * 5 % len(storage_types)]))
+            labs.append(("lab%d" % i, "account%d" % (i % 4), scenario))
+        cases.append(("fleet/25y/%dlabs" % count, functools.partial(simulate_fleet, labs, 1)))
+
+
+def object_cases():
+    # about 10^6 and 10^7 objects over 15 years
+    for panels in [30000, 300000]:
+        scenario = storagecosts.make_scenario(total_years_simulated=15, panel_count=panels, reaccess_count=1000,
+                                              tier2_storage_type="S3IA")
+        cases.append(("objects/15y/%dpanels" % panels, functools.partial(simulate_objects, scenario)))
+
+
+def cache_cases():
+    # a shared cache lookup and store of a data-store payload, to compare
+    # with the do_calculation cases that recompute it
+    cache = ResultCache(os.path.join(tempfile.mkdtemp(), "cache.sqlite"))
+    for years in [15, 25]:
+        payload = json.dumps(app.do_calculation(*(control_panel_values(years, "S3", "glacier") + (1,))))
+        key = canonical_key("payload", years)
+        cache.set(key, payload)
+        misses = ("miss-%d-%d" % (years, i) for i in itertools.count())
+        cases.extend([
+            ("cache/hit/%dy/interval1" % years, functools.partial(cache.get, key)),
+            ("cache/miss_and_store/%dy/interval1" % years,
+             lambda misses=misses, payload=payload: cache.get_or_compute(next(misses), lambda: payload)),
+        ])
+
+
+def rendering_cases():
+    for years in [15, 25]:
+        for interval in intervals:
+            label = "%dy/interval%d" % (years, interval)
+            payload = app.do_calculation(*(control_panel_values(years, "S3", "glacier") + (interval,)))
+            data = app.decode_payload(payload)
+            outputs = app.render(payload)
+            cases.extend([
+                ("serialize/payload/" + label, functools.partial(json.dumps, payload)),
+                ("serialize/figures/" + label,
+                 functools.partial(json.dumps, outputs, cls=plotly.utils.PlotlyJSONEncoder)),
+                ("render/update_plot/" + label, functools.partial(app.update_plot, data)),
+                ("render/update_piechart/" + label, functools.partial(app.update_piechart, data)),
+                ("render/update_stats/" + label, functools.partial(app.update_stats, data)),
+                ("render/all_outputs/" + label, functools.partial(app.render, payload)),
+            ])
+
+pricing_cases()
+simulation_cases()
+resample_cases()
+montecarlo_cases()
+fleet_cases()
+object_cases()
+cache_cases()
+rendering_cases()
+
+
+def time_case(func, repeats, min_time):
+    # calls per repeat are chosen so that each repeat takes at least `min_time`
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    timings = [elapsed / number]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    timings = np.array(timings) * 1000
+    return {
+        "min_ms": float(timings.min()),
+        "median_ms": float(np.median(timings)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "repeats": repeats,
+        "number": number,
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL,
+                                         cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plotly": plotly.__version__,
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)["results"]
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+    print("%-60s %12s %12s %8s" % ("case", "before ms", "after ms", "ratio"))
+    for name in sorted(set(before) & set(after)):
+        b, a = before[name]["median_ms"], after[name]["median_ms"]
+        print("%-60s %12.4f %12.4f %7.2fx" % (name, b, a, b / a if a else float("inf")))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", help="write results to this JSON file")
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per repeat (default: 0.05)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    results = {}
+    for name, func in cases:
+        if args.filter not in name:
+            continue
+        results[name] = time_case(func, args.repeats, args.min_time)
+        print("%-60s %10.4f ms" % (name, results[name]["median_ms"]))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
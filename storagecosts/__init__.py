@@ -0,0 +1,20 @@
+# Headless storage cost model: pricing tables and the simulation engine,
+# usable without Dash (see `python -m storagecosts --help`).
+from storagecosts.pricing import (
+    CostCurve, compile_cost_buckets, calc_cost_curve, calc_cost,
+    load_catalog, compile_catalog, pricing, catalog_version, storage_type_id, bills_egress,
+    storage_cost_buckets, transfer_cost_buckets, storage_cost_curves, transfer_cost_curves,
+    calc_storage_cost, calc_storage_costs, calc_reaccess_cost, calc_transfer_cost, get_compression_factor)
+from storagecosts.engine import (
+    monthly_series, tier_occupancy, carried_over, simulate_occupancy, price_tier, price_tiers, simulate, simulate_batch,
+    compare_storage_pairs, normalize_inputs, resample, resample_reductions, envelope_indices, summarize,
+    default_scenario, make_scenario)
+from storagecosts.daily import simulate_daily, days_per_month
+from storagecosts.fleet import simulate_fleet
+from storagecosts.lifecycle import lifecycle_occupancy, parse_stages, simulate_lifecycle
+from storagecosts.inventory import Cohorts, read_inventory, tier_cohorts
+from storagecosts.sensitivity import sensitivity
+from storagecosts.optimize import optimize_retention_split
+from storagecosts.closedform import occupancy_at, costs_at, steady_state
+from storagecosts.cohorts import cohort_costs
+from storagecosts.objects import Objects, simulate_objects
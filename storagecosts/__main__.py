@@ -0,0 +1,5 @@
+import sys
+
+from storagecosts.cli import main
+
+sys.exit(main())
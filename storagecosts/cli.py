@@ -0,0 +1,252 @@
+import argparse
+import contextlib
+import csv
+import json
+import os
+import sys
+import tempfile
+
+from storagecosts.engine import default_scenario, make_scenario, simulate, summarize, resample
+from storagecosts.daily import simulate_daily
+from storagecosts.objects import simulate_objects
+from storagecosts.fleet import simulate_fleet
+from storagecosts.lifecycle import parse_stages, simulate_lifecycle
+from storagecosts.inventory import read_inventory, tier_cohorts
+from storagecosts.export import series_fields, export
+
+text_fields = ["name", "account", "tier1_storage_type", "tier2_storage_type", "reaccess_target"]
+
+lifecycle_replaces = ["retention_time_tier1", "retention_time_tier2", "tier1_storage_type", "tier2_storage_type"]
+
+
+def parse_number(v):
+    # CSV cells are strings; JSON numbers are passed through
+    if not isinstance(v, str):
+        return v
+    try:
+        return int(v)
+    except ValueError:
+        return float(v)
+
+
+def read_records(path):
+    # records from a JSON file (one object or a list of objects) or a CSV
+    # file with one record per row, with empty cells left out
+    f = sys.stdin if path == "-" else open(path, newline="")
+    try:
+        if path.endswith(".csv"):
+            records = list(csv.DictReader(f))
+        else:
+            records = json.load(f)
+            if isinstance(records, dict):
+                records = [records]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+    for record in records:
+        values = {}
+        for k, v in record.items():
+            if v is None or v == "":
+                continue
+            values[k] = v if k in text_fields else parse_number(v)
+        yield values
+
+def read_scenarios(path):
+    # scenarios with scenario fields plus an optional `name` and
+    # `total_years_simulated`
+    scenarios = []
+    for i, values in enumerate(read_records(path)):
+        name = values.pop("name", str(i))
+        scenarios.append((name, make_scenario(**values)))
+    return scenarios
+
+def read_labs(path):
+    # (name, account, scenario) for fleet mode; labs without an `account`
+    # share one
+    labs = []
+    for i, values in enumerate(read_records(path)):
+        name = values.pop("name", str(i))
+        account = values.pop("account", "default")
+        labs.append((name, account, make_scenario(**values)))
+    return labs
+
+def run(scenarios, interval=1, daily=False, inventory=None, objects=False, seed=0):
+    # (name, scenario, summary, monthly (or daily) series resampled to
+    # `interval`); `inventory` cohorts are the data stored at the start
+    for name, scenario in scenarios:
+        if daily:
+            monthly = simulate_daily(scenario)
+        elif objects:
+            monthly = simulate_objects(scenario, seed)
+        else:
+            monthly = simulate(scenario, tier_cohorts(inventory, scenario) if inventory is not None else None)
+        series = {k: resample(monthly[k], interval, "max" if k == "total_stored" else "sum") for k in series_fields}
+        summary = summarize(monthly)
+        if objects:
+            summary["request_cost"] = float(monthly["request_cost"].sum())
+            summary["early_deletion_cost"] = float(monthly["early_deletion_cost"].sum())
+            summary["objects_written"] = len(monthly["objects"].size_gb)
+        yield name, scenario, summary, series
+
+
+def run_lifecycle(scenarios, stages, interval=1):
+    # like run(), under an N-stage lifecycle policy instead of the scenarios'
+    # two tiers; storage costs are given per stage
+    for name, scenario in scenarios:
+        monthly = simulate_lifecycle(scenario, stages)
+        stage_fields = ["stage%d_storage_cost" % (i + 1) for i in range(len(stages))]
+        for field, cost in zip(stage_fields, monthly["stage_storage_cost"]):
+            monthly[field] = cost
+        fields = ["total_stored", "samples_run"] + stage_fields + ["reaccess_cost", "costs"]
+        series = {k: resample(monthly[k], interval, "max" if k == "total_stored" else "sum") for k in fields}
+        summary = {field: float(monthly[field].sum()) for field in stage_fields}
+        summary.update({
+            "reaccess_cost": float(monthly["reaccess_cost"].sum()),
+            "lifetime_cost": float(monthly["costs"].sum()),
+            "samples_run": float(monthly["samples_run"].sum()),
+            "total_gb_generated": float(monthly["total_gb_stored"].sum()),
+            "peak_gb_stored": float(monthly["total_stored"].max(initial=0)),
+        })
+        # the stages replace the scenario's tiers
+        scenario = {k: v for k, v in scenario.items() if k not in lifecycle_replaces}
+        scenario["lifecycle"] = ",".join(t if r is None else "%s:%d" % (t, r) for t, r in stages)
+        yield name, scenario, summary, series
+
+def run_fleet(labs, interval=1, processes=None):
+    # like run(), with costs priced on the pooled volumes of each account;
+    # summaries also give each lab's cost if it were billed on its own
+    fleet = simulate_fleet(labs, processes)
+    for i, (name, account, scenario) in enumerate(labs):
+        monthly = {k: fleet[k][i] for k in series_fields + ["total_gb_stored"]}
+        summary = summarize(monthly)
+        summary["standalone_lifetime_cost"] = float(fleet["standalone_lifetime_cost"][i])
+        summary["pooling_savings"] = summary["standalone_lifetime_cost"] - summary["lifetime_cost"]
+        series = {k: resample(monthly[k], interval, "max" if k == "total_stored" else "sum") for k in series_fields}
+        yield name, dict(scenario, account=account, months=len(fleet["fleet_costs"])), summary, series
+
+def write_json(results, f, include_series):
+    out = []
+    for name, scenario, summary, series in results:
+        item = {"name": name, "scenario": scenario, "summary": summary}
+        if include_series:
+            item["series"] = {k: v.tolist() for k, v in series.items()}
+        out.append(item)
+    json.dump(out, f, indent=2)
+    f.write("\n")
+
+
+def write_csv(results, f, include_series):
+    # one row per scenario, or one row per scenario and timepoint with --series
+    writer = None
+    for name, scenario, summary, series in results:
+        base = dict(name=name, **scenario)
+        if include_series:
+            rows = [dict(base, timepoint=t, **{k: series[k][t] for k in series})
+                    for t in range(len(series["costs"]))]
+        else:
+            rows = [dict(base, **summary)]
+        if writer is None:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else list(base))
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+@contextlib.contextmanager
+def open_output(path, mode):
+    # `path` is only replaced once everything has been written, so a bad
+    # scenario never leaves a truncated or half-written file behind
+    if path == "-":
+        yield sys.stdout
+        return
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    # mkstemp files are private; give the output the usual permissions
+    umask = os.umask(0)
+    os.umask(umask)
+    try:
+        os.chmod(tmp, 0o666 & ~umask)
+        with os.fdopen(fd, mode, **({} if "b" in mode else {"newline": ""})) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m storagecosts",
+        description="Evaluate storage cost scenarios without the web app. Scenario fields "
+                    "(retention times in months) default to: %s" % ", ".join(
+                        "%s=%s" % kv for kv in sorted(default_scenario.items())))
+    parser.add_argument("scenarios", help="JSON or CSV file of scenarios, or - for JSON on stdin")
+    parser.add_argument("-o", "--output", default="-",
+                        help="output file; .csv writes CSV, .npz a columnar archive of the summaries and "
+                             "series (see storagecosts.export), anything else JSON (default: stdout)")
+    parser.add_argument("--series", action="store_true",
+                        help="include the cost series, not just the lifetime summary")
+    parser.add_argument("--interval", type=int, default=1,
+                        help="months (days with --daily) per timepoint of the series (default: 1)")
+    parser.add_argument("--daily", action="store_true",
+                        help="simulate day by day, including minimum storage duration charges")
+    parser.add_argument("--objects", action="store_true",
+                        help="simulate individual files, including request, minimum object size and "
+                             "early deletion charges")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed for file sizes and re-accesses with --objects (default: 0)")
+    parser.add_argument("--fleet", action="store_true",
+                        help="treat the scenarios as labs billed together by their `account` column, "
+                             "so that tiered prices apply to the pooled volumes")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes for --fleet (default: one per CPU)")
+    parser.add_argument("--inventory",
+                        help="start from the data in this storage inventory (CSV or CSV.gz, e.g. an S3 "
+                             "Inventory report or a listing with size, last_modified and storage_class columns)")
+    parser.add_argument("--as-of", help="date of the inventory as YYYY-MM (default: this month)")
+    parser.add_argument("--lifecycle", metavar="STAGES",
+                        help="store data through these lifecycle stages instead of the two tiers, as "
+                             "storage type:months pairs, e.g. S3:12,S3IA:24,glacier:60,deepglacier:120; "
+                             "leave the last stage's months out to keep data there forever")
+    args = parser.parse_args(argv)
+
+    if args.interval < 1:
+        parser.error("--interval must be at least 1")
+    if args.fleet and args.daily:
+        parser.error("--fleet and --daily cannot be combined")
+    if args.objects and (args.fleet or args.daily):
+        parser.error("--objects cannot be combined with --fleet or --daily")
+    if args.inventory and (args.fleet or args.daily or args.objects):
+        parser.error("--inventory cannot be combined with --fleet, --daily or --objects")
+    if args.lifecycle and (args.fleet or args.daily or args.objects or args.inventory):
+        parser.error("--lifecycle cannot be combined with --fleet, --daily, --objects or --inventory")
+    stages = None
+    if args.lifecycle:
+        try:
+            stages = parse_stages(args.lifecycle)
+        except ValueError as e:
+            parser.error("--lifecycle: %s" % e)
+    inventory = None
+    if args.inventory:
+        as_of = tuple(int(v) for v in args.as_of.split("-")[:2]) if args.as_of else None
+        try:
+            inventory = read_inventory(args.inventory, as_of)
+        except ValueError as e:
+            parser.error("--inventory: %s" % e)
+    if args.output.endswith(".npz"):
+        if args.fleet or args.daily or args.inventory or args.objects or args.lifecycle:
+            parser.error(".npz output is for plain scenarios only")
+        with open_output(args.output, "wb") as f:
+            export(read_scenarios(args.scenarios), f, "npz", interval=args.interval)
+        return 0
+    if stages:
+        results = run_lifecycle(read_scenarios(args.scenarios), stages, args.interval)
+    elif args.fleet:
+        results = run_fleet(read_labs(args.scenarios), args.interval, args.processes)
+    else:
+        results = run(read_scenarios(args.scenarios), args.interval, args.daily, inventory, args.objects, args.seed)
+    with open_output(args.output, "w") as f:
+        if args.output.endswith(".csv"):
+            write_csv(results, f, args.series)
+        else:
+            write_json(results, f, args.series)
+    return 0
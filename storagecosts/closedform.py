@@ -0,0 +1,70 @@
+import numpy as np
+
+from storagecosts.engine import split_by_share, monthly_reaccess_gb, price_tier
+
+# Analytic evaluation of the monthly model at individual months. Volumes are
+# a geometric series a, a*q, a*q^2, ... so the cumulative volume
+# C(k) = a (q^k - 1) / (q - 1) (or a*k without growth), which gives each
+# tier's occupancy, and so its costs, at any month in O(1) without
+# simulating the months before it. Lifetime totals are left to simulate():
+# re-access costs depend on each tier's share of the data, which has no
+# closed-form sum, and a vectorized pass over even a century of months is
+# faster than summing the storage costs piecewise.
+
+
+def volume_parameters(scenario):
+    # first month's GB and the monthly growth multiplier
+    genome_count, exome_count, panel_count = scenario["genome_count"], scenario["exome_count"], scenario["panel_count"]
+    genome_size, exome_size, panel_size = scenario["genome_size"], scenario["exome_size"], scenario["panel_size"]
+    yearly_total_gb = (genome_count * genome_size) + (exome_count * exome_size) + (panel_count * panel_size)
+    return yearly_total_gb / 12., 1 + scenario["volume_growth"]/12./100
+
+def cumulative(a, q, k):
+    # GB generated in the first k months
+    k = np.asarray(k, dtype=float)
+    if q == 1:
+        return a * k
+    return a * (q ** k - 1) / (q - 1)
+
+def occupancy_at(scenario, months):
+    # tier1 and tier2 GB at the given month indices; the same values as
+    # simulate_occupancy (including its indexing of moves) for any horizon
+    a, q = volume_parameters(scenario)
+    n = scenario["months"]
+    y = np.asarray(months)
+
+    def moved_out(lag):
+        k = y + 1 - lag
+        return np.where(k > 0, cumulative(a, q, np.clip(k + 1, 1, n)) - a, 0.)
+
+    # tier1 retentions under a month count as 1, as in tier_occupancy
+    retention_time_tier1 = max(scenario["retention_time_tier1"], 1)
+    moved_to_tier2 = moved_out(retention_time_tier1)
+    discarded = moved_out(retention_time_tier1 + scenario["retention_time_tier2"])
+    return cumulative(a, q, y + 1) - moved_to_tier2, moved_to_tier2 - discarded
+
+def costs_at(scenario, months):
+    # cost series of simulate() at the given month indices only
+    tier1, tier2 = occupancy_at(scenario, months)
+    tier1_reaccessed, tier2_reaccessed = split_by_share(monthly_reaccess_gb(scenario)[0], [tier1, tier2])
+    tier1_cost, tier1_reaccess_cost = price_tier(
+        scenario["tier1_storage_type"], tier1, tier1_reaccessed, scenario["reaccess_target"])
+    tier2_cost, tier2_reaccess_cost = price_tier(
+        scenario["tier2_storage_type"], tier2, tier2_reaccessed, scenario["reaccess_target"])
+    reaccess_cost = tier1_reaccess_cost + tier2_reaccess_cost
+    return {
+        "total_stored": tier1 + tier2,
+        "tier1_storage_cost": tier1_cost,
+        "tier2_storage_cost": tier2_cost,
+        "reaccess_cost": reaccess_cost,
+        "costs": tier1_cost + tier2_cost + reaccess_cost,
+    }
+
+def steady_state(scenario):
+    # monthly costs once data is deleted as fast as it arrives, which only
+    # happens without volume growth
+    if scenario["volume_growth"] != 0:
+        raise ValueError("costs only reach a steady state without volume growth")
+    month = scenario["retention_time_tier1"] + scenario["retention_time_tier2"] + 1
+    steady = dict(scenario, months=month + 2)
+    return {k: float(v[0]) for k, v in costs_at(steady, [month]).items()}
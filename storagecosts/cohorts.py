@@ -0,0 +1,95 @@
+import numpy as np
+
+from storagecosts.engine import simulate_occupancy
+from storagecosts.pricing import calc_storage_cost, calc_reaccess_cost, calc_transfer_cost
+
+# Attribution of the monthly model's costs to the cohort of data generated in
+# each month. A cohort only sits in a tier for its retention window, so each
+# tier is kept as a band: (cohorts x ages) arrays covering the ages at which
+# cohorts can be in that tier, O(months x retention) instead of months^2.
+#
+# Cohort membership follows the engine's occupancy (tier_occupancy), so the
+# attributed costs add up to simulate() month by month: cohort c >= 1 is in
+# tier1 for ages 0 .. r1-2 and in tier2 for ages r1-1 .. r1+r2-2, while the
+# first month's data is never moved out of tier1 (tier1 retentions under a
+# month count as 1, so tier1 holds only that data). Each month's tier
+# storage, retrieval and transfer costs are split between the cohorts in the
+# tier by their GB, matching how re-accesses are spread over stored data.
+
+cost_kinds = ["storage_cost", "retrieval_cost", "transfer_cost"]
+
+
+def tier_weights(ages, start, stop):
+    # membership of a cohort at each age in a tier held from age `start` up
+    # to `stop`
+    return ((ages >= start) & (ages < stop)).astype(float)
+
+def monthly_costs_per_gb(storage_type, stored, reaccessed, reaccess_target):
+    # storage, retrieval and transfer cost per GB held in a tier, each month
+    has_data = stored != 0
+    denominator = np.where(has_data, stored, 1.)
+    costs = [calc_storage_cost(storage_type, stored),
+             calc_reaccess_cost(storage_type, reaccessed),
+             calc_transfer_cost(storage_type, reaccess_target, reaccessed)]
+    return {kind: np.where(has_data, np.zeros_like(stored) + cost, 0.) / denominator
+            for kind, cost in zip(cost_kinds, costs)}
+
+def cohort_costs(scenario):
+    # Returns the band layout (`ages`), the GB and samples of each cohort,
+    # per tier and cost kind a (cohorts x ages) band of cost and the
+    # first cohort's dense row, each cohort's lifetime costs, and the
+    # lifetime cost per test of each test type by cohort.
+    occupancy = simulate_occupancy(scenario)
+    cohort_gb = occupancy["total_gb_stored"]
+    n = len(cohort_gb)
+    r1 = max(scenario["retention_time_tier1"], 1)
+    r2 = scenario["retention_time_tier2"]
+    windows = {"tier1": (0, r1 - 1), "tier2": (r1 - 1, r1 + r2 - 1)}
+    ages = np.arange(r1 + r2 - 1)
+
+    cohorts = np.arange(n)
+    months = cohorts[:, None] + ages[None, :]
+    in_horizon = (months >= 0) & (months < n) & (cohorts[:, None] >= 1)
+    months = np.clip(months, 0, max(n - 1, 0))
+
+    bands = {}
+    first_cohort = {}
+    lifetime = {kind: np.zeros(n) for kind in cost_kinds}
+    for tier in ["tier1", "tier2"]:
+        per_gb = monthly_costs_per_gb(scenario[tier + "_storage_type"], occupancy[tier],
+                                      occupancy[tier + "_reaccessed"], scenario["reaccess_target"])
+        weights = tier_weights(ages, *windows[tier])[None, :] * in_horizon * cohort_gb[:, None]
+        for kind in cost_kinds:
+            band = weights * per_gb[kind][months]
+            bands[tier, kind] = band
+            lifetime[kind] += band.sum(axis=1)
+            # the first month's data stays in tier1
+            first_cohort[tier, kind] = per_gb[kind] * cohort_gb[0] if tier == "tier1" and n else np.zeros(n)
+            if n:
+                lifetime[kind][0] += first_cohort[tier, kind].sum()
+
+    total = sum(lifetime.values())
+    has_gb = cohort_gb > 0
+    cost_per_gb = np.where(has_gb, total, 0.) / np.where(has_gb, cohort_gb, 1.)
+    return {
+        "ages": ages,
+        "cohort_gb": cohort_gb,
+        "samples_run": occupancy["samples_run"],
+        "bands": bands,
+        "first_cohort": first_cohort,
+        "lifetime": lifetime,
+        "lifetime_cost": total,
+        # every test of a cohort costs the cohort's cost per GB times its size
+        "cost_per_test": {test: cost_per_gb * scenario[test + "_size"] for test in ["genome", "exome", "panel"]},
+    }
+
+def monthly_totals(result):
+    # the attributed costs added up per month, to check against simulate()
+    n = len(result["cohort_gb"])
+    months = np.arange(n)[:, None] + result["ages"][None, :]
+    valid = (months >= 0) & (months < n)
+    totals = {}
+    for (tier, kind), band in result["bands"].items():
+        total = np.bincount(months[valid], weights=band[valid], minlength=n) + result["first_cohort"][tier, kind]
+        totals[tier, kind] = total
+    return totals
@@ -0,0 +1,82 @@
+import numpy as np
+
+from storagecosts.engine import monthly_series, monthly_reaccess_gb, split_by_share, price_tier
+from storagecosts.lifecycle import lifecycle_occupancy
+from storagecosts.pricing import pricing, storage_type_id
+
+# Daily-resolution variant of simulate(). Volumes grow day by day at the
+# scenario's monthly growth rate, data spends exactly its retention (converted
+# to days) in each tier, and prices per GB-month are prorated per day. Unlike
+# the monthly model this resolves minimum storage durations: data moved out of
+# or deleted from a tier before the storage class's minimum duration is billed
+# for the remaining days when it leaves, at the class's first bucket price.
+days_per_month = 365.25 / 12
+
+
+def to_days(months):
+    return int(round(months * days_per_month))
+
+def daily_volumes(scenario):
+    # samples run and GB generated each day
+    genome_count, exome_count, panel_count = scenario["genome_count"], scenario["exome_count"], scenario["panel_count"]
+    genome_size, exome_size, panel_size = scenario["genome_size"], scenario["exome_size"], scenario["panel_size"]
+    days = to_days(scenario["months"])
+
+    yearly_total_samples = np.asarray(genome_count + exome_count + panel_count, dtype=float)
+    yearly_total_gb = (genome_count * genome_size) + (exome_count * exome_size) + (panel_count * panel_size)
+    daily_volume_multiplier = (1 + np.asarray(scenario["volume_growth"], dtype=float)/12./100) ** (1 / days_per_month)
+
+    samples_run = monthly_series(yearly_total_samples / 365.25, daily_volume_multiplier, days)
+    daily_gb = monthly_series(yearly_total_gb / 365.25, daily_volume_multiplier, days)
+    return samples_run, daily_gb
+
+def leaving_gb(daily_gb, days):
+    # GB leaving a tier each day when data stays in it for `days` days
+    leaving = np.zeros_like(daily_gb)
+    n = daily_gb.shape[-1]
+    if days < n:
+        leaving[..., days:] = daily_gb[..., :n - days]
+    return leaving
+
+def early_deletion_cost(storage_type, daily_gb, days_in_tier, days_before):
+    # charge for data leaving `storage_type` before its minimum duration;
+    # `days_before` is the time the data spent in earlier tiers
+    type_id = storage_type_id(storage_type)
+    shortfall = pricing["minimum_days"][type_id] - days_in_tier
+    if days_in_tier == 0 or shortfall <= 0:
+        return np.zeros_like(daily_gb)
+    rate = pricing["storage_base_rates"][type_id]
+    return leaving_gb(daily_gb, days_before + days_in_tier) * (shortfall / days_per_month * rate)
+
+def simulate_daily(scenario):
+    # same series as simulate(), one value per day, plus the early deletion
+    # charges (which are also included in the tier storage costs)
+    samples_run, daily_gb = daily_volumes(scenario)
+    tier1_days = to_days(scenario["retention_time_tier1"])
+    tier2_days = to_days(scenario["retention_time_tier2"])
+    tier1, tier2 = lifecycle_occupancy(daily_gb, [tier1_days, tier2_days])
+
+    # re-access volumes are kept per month so that egress buckets apply to
+    # monthly totals, and the resulting costs are prorated per day
+    tier1_reaccessed, tier2_reaccessed = split_by_share(monthly_reaccess_gb(scenario), [tier1, tier2])
+    tier1_cost, tier1_reaccess_cost = price_tier(
+        scenario["tier1_storage_type"], tier1, tier1_reaccessed, scenario["reaccess_target"])
+    tier2_cost, tier2_reaccess_cost = price_tier(
+        scenario["tier2_storage_type"], tier2, tier2_reaccessed, scenario["reaccess_target"])
+
+    tier1_early = early_deletion_cost(scenario["tier1_storage_type"], daily_gb, tier1_days, 0)
+    tier2_early = early_deletion_cost(scenario["tier2_storage_type"], daily_gb, tier2_days, tier1_days)
+    tier1_cost = tier1_cost / days_per_month + tier1_early
+    tier2_cost = tier2_cost / days_per_month + tier2_early
+    reaccess_cost = (tier1_reaccess_cost + tier2_reaccess_cost) / days_per_month
+
+    return {
+        "total_gb_stored": daily_gb,
+        "total_stored": tier1 + tier2,
+        "samples_run": samples_run,
+        "tier1_storage_cost": tier1_cost,
+        "tier2_storage_cost": tier2_cost,
+        "early_deletion_cost": tier1_early + tier2_early,
+        "reaccess_cost": reaccess_cost,
+        "costs": tier1_cost + tier2_cost + reaccess_cost,
+    }
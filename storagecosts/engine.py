@@ -0,0 +1,370 @@
+import numpy as np
+
+from storagecosts.pricing import (
+    pricing, storage_type_id, bills_egress, calc_cost_curve, calc_storage_cost, calc_storage_costs,
+    calc_reaccess_cost, calc_transfer_cost, get_compression_factor)
+
+
+def monthly_series(initial, multiplier, months):
+    # geometric series initial, initial*multiplier, ... built with the same
+    # sequence of multiplications as stepping `running_total *= multiplier`.
+    # `initial` and `multiplier` may be arrays (e.g. one value per trial);
+    # months are then the last axis of the result.
+    initial, multiplier = np.broadcast_arrays(np.asarray(initial, dtype=float), np.asarray(multiplier, dtype=float))
+    factors = np.empty(initial.shape + (max(months, 0),))
+    if months <= 0:
+        return factors
+    factors[..., 0] = initial
+    factors[..., 1:] = multiplier[..., None]
+    return np.multiply.accumulate(factors, axis=-1)
+
+def tier_occupancy(monthly_gb, retention_time_tier1, retention_time_tier2):
+    # GB held in tier1 and tier2 at the end of each month. Data is moved out of
+    # a tier `retention` months after it arrived, so each tier total is a
+    # lagged difference of the cumulative volume. Months are the last axis;
+    # retention times may be arrays of trials too. With the original loop's
+    # indexing a tier1 retention of 1 month already moves all but the first
+    # month's data straight to tier2, so shorter retentions count as 1.
+    monthly_gb = np.asarray(monthly_gb, dtype=float)
+    retention_time_tier1 = np.maximum(retention_time_tier1, 1)
+    n = monthly_gb.shape[-1]
+    if n == 0:
+        return np.zeros_like(monthly_gb), np.zeros_like(monthly_gb)
+    timepoints = np.arange(1, n + 1)
+    cumulative = np.concatenate((np.zeros(monthly_gb.shape[:-1] + (1,)), np.cumsum(monthly_gb, axis=-1)), axis=-1)
+
+    def moved_out(lag):
+        # total moved out by month y, starting with the volume at index 1
+        # (matches the indexing used by the original month-by-month loop)
+        k = timepoints - np.asarray(lag)[..., None]
+        idx = np.clip(k + 1, 1, n).astype(int)
+        if idx.ndim == 1:
+            moved = cumulative[..., idx]
+        else:
+            shape = np.broadcast(cumulative[..., :1], idx).shape[:-1]
+            moved = np.take_along_axis(np.broadcast_to(cumulative, shape + (n + 1,)),
+                                       np.broadcast_to(idx, shape + (n,)), axis=-1)
+        return np.where(k > 0, moved - cumulative[..., 1:2], 0.)
+
+    moved_to_tier2 = moved_out(retention_time_tier1)
+    discarded = moved_out(retention_time_tier1 + retention_time_tier2)
+    tier1 = cumulative[..., 1:] - moved_to_tier2
+    tier2 = moved_to_tier2 - discarded
+    return tier1, tier2
+
+def carried_over(tier1_cohorts, tier2_cohorts, retention_time_tier1, retention_time_tier2, months):
+    # GB of data already stored at the start that is still held in tier1 and
+    # tier2 at each month. Cohorts are GB by age in months; data is moved on
+    # and deleted at the ages the retention policy gives, so data already
+    # past them goes at once.
+    timepoints = np.arange(months)
+
+    def younger_than(cohorts, age):
+        cumulative = np.concatenate(([0.], np.cumsum(cohorts)))
+        return cumulative[np.clip(age - timepoints, 0, len(cohorts))]
+
+    retention = retention_time_tier1 + retention_time_tier2
+    tier1 = younger_than(tier1_cohorts, retention_time_tier1)
+    tier2 = younger_than(tier1_cohorts, retention) - tier1 + younger_than(tier2_cohorts, retention)
+    return tier1, tier2
+
+def monthly_volumes(scenario):
+    # samples run and GB generated each month. Counts, sizes and growth may be
+    # arrays of trials, in which case months are the last axis.
+    genome_count, exome_count, panel_count = scenario["genome_count"], scenario["exome_count"], scenario["panel_count"]
+    genome_size, exome_size, panel_size = scenario["genome_size"], scenario["exome_size"], scenario["panel_size"]
+    months = scenario["months"]
+
+    yearly_total_samples = np.asarray(genome_count + exome_count + panel_count, dtype=float)
+    yearly_total_gb = (genome_count * genome_size) + (exome_count * exome_size) + (panel_count * panel_size)
+
+    # define monthly multiplier based on yearly percent growth
+    monthly_volume_multiplier = (1 + np.asarray(scenario["volume_growth"], dtype=float)/12./100)
+
+    # for first month, use 1/12th of the yearly samples and gb
+    samples_run = monthly_series(yearly_total_samples / 12., monthly_volume_multiplier, months)
+    monthly_gb = monthly_series(yearly_total_gb / 12., monthly_volume_multiplier, months)
+    return samples_run, monthly_gb
+
+def monthly_reaccess_gb(scenario):
+    # GB re-accessed each month (constant over time), with a trailing axis
+    # so it broadcasts against monthly series
+    genome_count, exome_count, panel_count = scenario["genome_count"], scenario["exome_count"], scenario["panel_count"]
+    genome_size, exome_size, panel_size = scenario["genome_size"], scenario["exome_size"], scenario["panel_size"]
+    yearly_total_samples = np.asarray(genome_count + exome_count + panel_count, dtype=float)
+
+    has_samples = yearly_total_samples > 0
+    samples = np.where(has_samples, yearly_total_samples, 1.)
+    monthly_reaccess_count = np.asarray(scenario["reaccess_count"], dtype=float)/12.
+    total_gb_reaccessed = ((monthly_reaccess_count * genome_count / samples) * genome_size) + \
+                          ((monthly_reaccess_count * exome_count / samples) * exome_size) + \
+                          ((monthly_reaccess_count * panel_count / samples) * panel_size)
+    return np.where(has_samples, total_gb_reaccessed, 0.)[..., None]
+
+def split_by_share(total, parts):
+    # split `total` between `parts` in proportion to their size
+    stored = sum(parts)
+    has_data = stored > 0
+    denominator = np.where(has_data, stored, 1.)
+    return [np.where(has_data, total * part / denominator, 0.) for part in parts]
+
+def simulate_occupancy(scenario, seed=None):
+    # provider-independent part of the model: volumes generated, GB held in
+    # each tier and GB re-accessed from each tier, month by month. Counts,
+    # sizes, growth and reaccess count may be arrays of trials, in which case
+    # every series gets a leading trial axis. `seed` is the data stored at
+    # the start, as (tier1, tier2) GB by age in months.
+    samples_run, monthly_gb = monthly_volumes(scenario)
+    tier1, tier2 = tier_occupancy(monthly_gb, scenario["retention_time_tier1"], scenario["retention_time_tier2"])
+    if seed is not None:
+        seed_tier1, seed_tier2 = carried_over(seed[0], seed[1], scenario["retention_time_tier1"],
+                                              scenario["retention_time_tier2"], scenario["months"])
+        tier1, tier2 = tier1 + seed_tier1, tier2 + seed_tier2
+
+    # the volume re-accessed each month is constant and split between tiers
+    # by their share of the data
+    tier1_reaccessed, tier2_reaccessed = split_by_share(monthly_reaccess_gb(scenario), [tier1, tier2])
+
+    return {
+        "total_gb_stored": monthly_gb,
+        "total_stored": tier1 + tier2,
+        "samples_run": samples_run,
+        "tier1": tier1,
+        "tier2": tier2,
+        "tier1_reaccessed": tier1_reaccessed,
+        "tier2_reaccessed": tier2_reaccessed,
+    }
+
+def price_tier(storage_type, stored, reaccessed, reaccess_target):
+    # storage cost and re-access cost (includes transfer cost) of one tier
+    storage_cost = calc_storage_cost(storage_type, stored)
+    # free re-access and within-cloud transfers are priced as a scalar 0
+    reaccess_cost = np.zeros_like(reaccessed) + \
+                    calc_reaccess_cost(storage_type, reaccessed) + \
+                    calc_transfer_cost(storage_type, reaccess_target, reaccessed)
+    return storage_cost, reaccess_cost
+
+def price_tiers(type_ids, stored, reaccessed, reaccess_target):
+    # price_tier for several storage class ids at once; every egress table is
+    # evaluated once and shared by the classes that use it
+    storage_cost = calc_storage_costs(type_ids, stored)
+    reaccessed = np.asarray(reaccessed, dtype=float)
+    reaccess_cost = pricing["retrieval_rates"][type_ids].reshape((-1,) + (1,) * reaccessed.ndim) * reaccessed
+    if bills_egress(reaccess_target):
+        transfer_costs = np.array([calc_cost_curve(curve, reaccessed) for curve in pricing["transfer_curves"]])
+        reaccess_cost = reaccess_cost + transfer_costs[pricing["egress_index"][type_ids]]
+    return storage_cost, reaccess_cost
+
+def simulate(scenario, seed=None):
+    # month-by-month cost model, evaluated over the whole horizon at once.
+    # `scenario` is the output of normalize_inputs; returns one array per series.
+    occupancy = simulate_occupancy(scenario, seed)
+    tier1_cost, tier1_reaccess_cost = price_tier(
+        scenario["tier1_storage_type"], occupancy["tier1"], occupancy["tier1_reaccessed"], scenario["reaccess_target"])
+    tier2_cost, tier2_reaccess_cost = price_tier(
+        scenario["tier2_storage_type"], occupancy["tier2"], occupancy["tier2_reaccessed"], scenario["reaccess_target"])
+    reaccess_cost = tier1_reaccess_cost + tier2_reaccess_cost
+
+    return {
+        "total_gb_stored": occupancy["total_gb_stored"],
+        "total_stored": occupancy["total_stored"],
+        "samples_run": occupancy["samples_run"],
+        "tier1_storage_cost": tier1_cost,
+        "tier2_storage_cost": tier2_cost,
+        "reaccess_cost": reaccess_cost,
+        "costs": tier1_cost + tier2_cost + reaccess_cost,
+    }
+
+# scenario fields that only affect volumes and occupancy, not prices
+occupancy_fields = ["genome_count", "exome_count", "panel_count", "genome_size", "exome_size", "panel_size",
+                    "volume_growth", "reaccess_count", "retention_time_tier1", "retention_time_tier2"]
+
+def simulate_batch(scenarios):
+    # simulate() for a list of scenarios. Scenarios with the same horizon have
+    # their volumes and occupancy evaluated together as one array of trials,
+    # and rows with the same storage types and destination are priced together.
+    results = [None] * len(scenarios)
+    horizons = {}
+    for i, scenario in enumerate(scenarios):
+        horizons.setdefault(scenario["months"], []).append(i)
+    for rows in horizons.values():
+        batch = dict(scenarios[rows[0]])
+        for field in occupancy_fields:
+            batch[field] = np.array([scenarios[i][field] for i in rows], dtype=float)
+        occupancy = simulate_occupancy(batch)
+        price_groups = {}
+        for j, i in enumerate(rows):
+            scenario = scenarios[i]
+            key = (scenario["tier1_storage_type"], scenario["tier2_storage_type"], scenario["reaccess_target"])
+            price_groups.setdefault(key, []).append(j)
+        for (tier1_storage_type, tier2_storage_type, reaccess_target), group in price_groups.items():
+            tier1_cost, tier1_reaccess_cost = price_tier(
+                tier1_storage_type, occupancy["tier1"][group], occupancy["tier1_reaccessed"][group], reaccess_target)
+            tier2_cost, tier2_reaccess_cost = price_tier(
+                tier2_storage_type, occupancy["tier2"][group], occupancy["tier2_reaccessed"][group], reaccess_target)
+            reaccess_cost = np.zeros_like(tier1_cost) + tier1_reaccess_cost + tier2_reaccess_cost
+            for k, j in enumerate(group):
+                results[rows[j]] = {
+                    "total_gb_stored": occupancy["total_gb_stored"][j],
+                    "total_stored": occupancy["total_stored"][j],
+                    "samples_run": occupancy["samples_run"][j],
+                    "tier1_storage_cost": tier1_cost[k],
+                    "tier2_storage_cost": tier2_cost[k],
+                    "reaccess_cost": reaccess_cost[k],
+                    "costs": tier1_cost[k] + tier2_cost[k] + reaccess_cost[k],
+                }
+    return results
+
+def compare_storage_pairs(scenario, storage_types=None):
+    # lifetime cost of every tier1 x tier2 storage type combination. Volumes
+    # and tier occupancy are shared by all pairs, and since the cost of a pair
+    # is the cost of its tier1 part plus the cost of its tier2 part, each
+    # storage type only has to be priced once per tier.
+    if storage_types is None:
+        storage_types = list(pricing["storage_types"])
+    type_ids = np.array([storage_type_id(t) for t in storage_types], dtype=int)
+    occupancy = simulate_occupancy(scenario)
+
+    def lifetime_costs(tier):
+        storage_cost, reaccess_cost = price_tiers(
+            type_ids, occupancy[tier], occupancy[tier + "_reaccessed"], scenario["reaccess_target"])
+        return storage_cost.sum(axis=-1) + reaccess_cost.sum(axis=-1)
+
+    cost_matrix = lifetime_costs("tier1")[:, None] + lifetime_costs("tier2")[None, :]
+    order = np.argsort(cost_matrix, axis=None, kind='mergesort')
+    rows, cols = np.unravel_index(order, cost_matrix.shape)
+    return {
+        "storage_types": storage_types,
+        "cost_matrix": cost_matrix,
+        "ranking": [(storage_types[r], storage_types[c], cost_matrix[r, c]) for r, c in zip(rows, cols)],
+    }
+
+def normalize_inputs(is_custom,
+                     simple_genome_count, simple_exome_count,
+                     simple_large_panel_count,
+                     genome_count, exome_count, panel_count,
+                     genome_size, exome_size, panel_size,
+                     file_type,
+                     retention_time_tier1, retention_time_tier1_units,
+                     retention_years_tier2,
+                     tier1_storage_type, tier2_storage_type,
+                     volume_growth, total_years_simulated,
+                     reaccess_count, reaccess_target):
+    # turn the control panel values into a scenario for the engine
+    compression = get_compression_factor(file_type)
+
+    if not is_custom:
+        genome_count = simple_genome_count
+        genome_size = 120 * compression
+        exome_count = simple_exome_count
+        exome_size = 6 * compression
+        panel_count = simple_large_panel_count
+        panel_size = 1 * compression
+
+    # note the engine defines timepoints in MONTHS
+
+    # convert years from input to months (for calculations)
+    if retention_time_tier1_units == "years":
+        retention_time_tier1 = retention_time_tier1 * 12
+    retention_time_tier2 = retention_years_tier2 * 12
+    total_time_simulated = total_years_simulated * 12
+
+    # find maximum timeframe we need to calculate
+    m = max(retention_time_tier1, retention_time_tier1+retention_time_tier2, total_time_simulated+1)
+
+    return {
+        "genome_count": genome_count,
+        "exome_count": exome_count,
+        "panel_count": panel_count,
+        "genome_size": genome_size,
+        "exome_size": exome_size,
+        "panel_size": panel_size,
+        "retention_time_tier1": retention_time_tier1,
+        "retention_time_tier2": retention_time_tier2,
+        "tier1_storage_type": tier1_storage_type,
+        "tier2_storage_type": tier2_storage_type,
+        "volume_growth": volume_growth,
+        "months": m - 1,
+        "reaccess_count": reaccess_count,
+        "reaccess_target": reaccess_target,
+    }
+
+resample_reductions = {
+    "sum": np.add,
+    "max": np.maximum,
+    "mean": np.add,
+    "last": None,
+}
+
+def resample(array, interval, how="sum"):
+    # reduce consecutive bins of `interval` values along the last axis with
+    # `how` (one of resample_reductions); the last bin is partial if the
+    # series length is not a multiple of the interval
+    a = np.asarray(array, dtype=float)
+    if how not in resample_reductions:
+        raise ValueError("unknown resample reduction %r" % how)
+    if a.shape[-1] == 0:
+        return a
+    starts = np.arange(0, a.shape[-1], interval)
+    ends = np.minimum(starts + interval, a.shape[-1])
+    if how == "last":
+        return a[..., ends - 1]
+    binned = resample_reductions[how].reduceat(a, starts, axis=-1)
+    if how == "mean":
+        binned = binned / (ends - starts)
+    return binned
+
+def envelope_indices(array, max_points):
+    # indices of the minimum and maximum of `array` in each of max_points/2
+    # equal bins (in order, with the first and last point), for plotting a
+    # long series with at most about `max_points` points without losing peaks
+    a = np.asarray(array, dtype=float)
+    n = len(a)
+    if n <= max_points:
+        return np.arange(n)
+    bins = max(max_points // 2 - 1, 1)
+    width = -(-n // bins)
+    padded = np.full(bins * width, np.nan)
+    padded[:n] = a
+    padded = padded.reshape(bins, width)
+    offsets = np.arange(bins) * width
+    # all-nan bins only occur past the end of the array and are dropped below
+    lows = np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1) + offsets
+    highs = np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1) + offsets
+    indices = np.unique(np.concatenate(([0, n - 1], lows, highs)))
+    return indices[indices < n]
+
+def summarize(monthly):
+    # lifetime totals of the series returned by simulate
+    return {
+        "tier1_storage_cost": float(np.sum(monthly["tier1_storage_cost"])),
+        "tier2_storage_cost": float(np.sum(monthly["tier2_storage_cost"])),
+        "reaccess_cost": float(np.sum(monthly["reaccess_cost"])),
+        "lifetime_cost": float(np.sum(monthly["costs"])),
+        "samples_run": float(np.sum(monthly["samples_run"])),
+        "total_gb_generated": float(np.sum(monthly["total_gb_stored"])),
+        "peak_gb_stored": float(np.max(monthly["total_stored"], initial=0)),
+    }
+
+# defaults of the control panel's custom pane, as an engine scenario
+default_scenario = normalize_inputs(
+    True, 0, 0, 0, 0, 0, 0, 120, 6, 1, "BAM",
+    2, "years", 3, "S3", "glacier", 5, 15, 0, "within-cloud")
+
+def make_scenario(total_years_simulated=None, **values):
+    # scenario from the defaults and any overrides. Retention times are in
+    # months; if `months` isn't given it is derived from the retention times
+    # and `total_years_simulated` the same way as normalize_inputs does.
+    unknown = set(values) - set(default_scenario)
+    if unknown:
+        raise ValueError("unknown scenario fields: %s" % ", ".join(sorted(unknown)))
+    scenario = dict(default_scenario, **values)
+    if "months" not in values:
+        if total_years_simulated is None:
+            total_years_simulated = 15
+        retention_time_tier1 = scenario["retention_time_tier1"]
+        retention_time_tier2 = scenario["retention_time_tier2"]
+        m = max(retention_time_tier1, retention_time_tier1+retention_time_tier2, total_years_simulated*12+1)
+        scenario["months"] = m - 1
+    scenario["months"] = int(scenario["months"])
+    return scenario
@@ -0,0 +1,128 @@
+import csv
+import io
+import zipfile
+
+import numpy as np
+
+from storagecosts.engine import default_scenario, simulate_batch, summarize, resample
+
+# Bulk export of scenario results as two tables: `summaries` (one row per
+# scenario: its name, fields and lifetime totals) and `series` (one row per
+# scenario and timepoint). Scenarios are simulated and written a chunk at a
+# time, so memory use does not grow with the size of the batch. Tables are
+# written as CSV (one table per file) or as a columnar archive: a zip of
+# .npy arrays, one per column and chunk ("series/000003/costs.npy"), that
+# numpy reads without any other dependency (see read_columnar).
+
+series_fields = ["total_stored", "samples_run", "tier1_storage_cost", "tier2_storage_cost", "reaccess_cost", "costs"]
+
+scenario_fields = sorted(default_scenario)
+
+tables = ["summaries", "series"]
+
+formats = ["csv", "npz"]
+
+
+def result_chunks(scenarios, interval=1, chunk_size=100):
+    # `scenarios` is an iterable of (name, scenario); yields the summary and
+    # series columns of each chunk of scenarios
+    chunk = []
+    for item in scenarios:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk_columns(chunk, interval)
+            chunk = []
+    if chunk:
+        yield chunk_columns(chunk, interval)
+
+def chunk_columns(chunk, interval):
+    names = [name for name, scenario in chunk]
+    monthly = simulate_batch([scenario for name, scenario in chunk])
+    summaries = [summarize(m) for m in monthly]
+    series = [{k: resample(m[k], interval, "max" if k == "total_stored" else "sum") for k in series_fields}
+              for m in monthly]
+    lengths = [len(s["costs"]) for s in series]
+
+    summary_columns = {"name": np.array(names, dtype=str)}
+    for field in scenario_fields:
+        summary_columns[field] = np.array([scenario[field] for name, scenario in chunk])
+    for field in summaries[0] if summaries else []:
+        summary_columns[field] = np.array([summary[field] for summary in summaries])
+
+    series_columns = {
+        "name": np.repeat(np.array(names, dtype=str), lengths),
+        "timepoint": np.concatenate([np.arange(n) for n in lengths]) if lengths else np.zeros(0, dtype=int),
+    }
+    for field in series_fields:
+        series_columns[field] = np.concatenate([s[field] for s in series]) if series else np.zeros(0)
+    return {"summaries": summary_columns, "series": series_columns}
+
+
+class _Buffer(object):
+    # write-only stream whose contents are taken after each chunk
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def iter_csv(scenarios, table="summaries", interval=1, chunk_size=100):
+    # bytes of a CSV of one table, a chunk of scenarios at a time
+    if table not in tables:
+        raise ValueError("unknown table %r" % (table,))
+    header = True
+    for columns in result_chunks(scenarios, interval, chunk_size):
+        columns = columns[table]
+        text = io.StringIO()
+        writer = csv.writer(text)
+        if header:
+            writer.writerow(list(columns))
+            header = False
+        writer.writerows(zip(*[c.tolist() for c in columns.values()]))
+        yield text.getvalue().encode("utf-8")
+
+def iter_columnar(scenarios, interval=1, chunk_size=100):
+    # bytes of a columnar archive of both tables, a chunk at a time
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i, columns in enumerate(result_chunks(scenarios, interval, chunk_size)):
+            for table in tables:
+                for name, values in columns[table].items():
+                    with archive.open("%s/%06d/%s.npy" % (table, i, name), "w") as member:
+                        np.lib.format.write_array(member, values, allow_pickle=False)
+            yield buffer.take()
+    yield buffer.take()
+
+def iter_export(scenarios, format="csv", table="summaries", interval=1, chunk_size=100):
+    if format == "csv":
+        return iter_csv(scenarios, table, interval, chunk_size)
+    if format == "npz":
+        return iter_columnar(scenarios, interval, chunk_size)
+    raise ValueError("unknown export format %r" % (format,))
+
+def export(scenarios, f, format="csv", table="summaries", interval=1, chunk_size=100):
+    # write the export of (name, scenario) pairs to a binary file object
+    for data in iter_export(scenarios, format, table, interval, chunk_size):
+        f.write(data)
+
+def read_columnar(path):
+    # {table: {column: array}} of a columnar archive, with chunks joined
+    chunks = {}
+    with zipfile.ZipFile(path) as archive:
+        for member in archive.namelist():
+            table, chunk, column = member[:-len(".npy")].split("/")
+            with archive.open(member) as f:
+                chunks.setdefault(table, {}).setdefault(column, []).append(np.lib.format.read_array(f))
+    return {table: {column: np.concatenate(parts) for column, parts in columns.items()}
+            for table, columns in chunks.items()}
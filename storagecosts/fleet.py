@@ -0,0 +1,114 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from storagecosts.engine import simulate_occupancy, split_by_share
+from storagecosts.pricing import pricing, storage_type_id, bills_egress, calc_cost_curve
+
+# Fleet mode: many labs, each its own scenario, billed through shared
+# accounts. Volumes and tier occupancy are simulated per lab (in a process
+# pool for large fleets); storage is then priced on the combined GB held in
+# each storage class of an account, whichever tier holds it, and egress on the combined GB sent out
+# through each egress table, so the tiered curves see the pooled volumes.
+# Pooled costs are attributed back to the labs by their share of the volume
+# each month. Retrieval is priced per GB and needs no pooling.
+
+tiers = ["tier1", "tier2"]
+
+# labs per task sent to a worker process
+chunk_size = 64
+
+
+def lab_occupancy(scenarios):
+    return [simulate_occupancy(scenario) for scenario in scenarios]
+
+def simulate_labs(scenarios, processes=None):
+    # simulate_occupancy for every scenario, in `processes` worker processes
+    # (default: one per CPU); small fleets are run in this process
+    chunks = [scenarios[i:i + chunk_size] for i in range(0, len(scenarios), chunk_size)]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(chunks))
+    if processes <= 1:
+        return lab_occupancy(scenarios)
+    with ProcessPoolExecutor(processes) as pool:
+        return [occupancy for chunk in pool.map(lab_occupancy, chunks) for occupancy in chunk]
+
+def simulate_fleet(labs, processes=None):
+    # `labs` is a list of (name, account, scenario). All labs are simulated
+    # over the longest horizon among them. Returns per-lab series (labs x
+    # months) of pooled costs, the standalone lifetime cost of every lab
+    # priced on its own, and the fleet totals.
+    names = [name for name, account, scenario in labs]
+    accounts = [account for name, account, scenario in labs]
+    months = max(scenario["months"] for name, account, scenario in labs)
+    scenarios = [dict(scenario, months=months) for name, account, scenario in labs]
+    occupancy = simulate_labs(scenarios, processes)
+
+    stored = {tier: np.array([o[tier] for o in occupancy]) for tier in tiers}
+    reaccessed = {tier: np.array([np.broadcast_to(o[tier + "_reaccessed"], (months,)) for o in occupancy])
+                  for tier in tiers}
+    type_ids = {tier: np.array([storage_type_id(s[tier + "_storage_type"]) for s in scenarios], dtype=int)
+                for tier in tiers}
+    billed = np.array([bills_egress(s["reaccess_target"]) for s in scenarios], dtype=bool)
+    account_ids = np.unique(accounts, return_inverse=True)[1]
+
+    storage_cost = {tier: np.zeros((len(labs), months)) for tier in tiers}
+    reaccess_cost = np.zeros((len(labs), months))
+    standalone_cost = np.zeros(len(labs))
+
+    for tier in tiers:
+        ids = type_ids[tier]
+        reaccess_cost += pricing["retrieval_rates"][ids][:, None] * reaccessed[tier]
+        for type_id in np.unique(ids):
+            labs_of_type = ids == type_id
+            curve = pricing["storage_curves"][type_id]
+            standalone_cost[labs_of_type] += calc_cost_curve(curve, stored[tier][labs_of_type]).sum(axis=-1)
+
+    # storage of all tiers of an account that are held in the same class
+    for type_id in np.unique(np.concatenate([type_ids[tier] for tier in tiers])):
+        curve = pricing["storage_curves"][type_id]
+        for account in np.unique(account_ids):
+            holders = [(tier, np.flatnonzero((account_ids == account) & (type_ids[tier] == type_id)))
+                       for tier in tiers]
+            holders = [(tier, members) for tier, members in holders if len(members)]
+            if not holders:
+                continue
+            parts = list(np.concatenate([stored[tier][members] for tier, members in holders]))
+            shares = iter(split_by_share(calc_cost_curve(curve, sum(parts)), parts))
+            for tier, members in holders:
+                storage_cost[tier][members] = [next(shares) for member in members]
+
+    # egress of all tiers of an account that go through the same table
+    egress_ids = {tier: pricing["egress_index"][type_ids[tier]] for tier in tiers}
+    for egress in np.unique(np.concatenate([egress_ids[tier][billed] for tier in tiers])):
+        curve = pricing["transfer_curves"][egress]
+        for account in np.unique(account_ids):
+            senders = [(tier, np.flatnonzero(billed & (account_ids == account) & (egress_ids[tier] == egress)))
+                       for tier in tiers]
+            parts = [reaccessed[tier][members] for tier, members in senders if len(members)]
+            if not parts:
+                continue
+            parts = np.concatenate(parts)
+            shares = split_by_share(calc_cost_curve(curve, parts.sum(axis=0)), list(parts))
+            lab_ids = np.concatenate([members for tier, members in senders])
+            np.add.at(reaccess_cost, lab_ids, np.array(shares))
+            np.add.at(standalone_cost, lab_ids, calc_cost_curve(curve, parts).sum(axis=-1))
+
+    standalone_cost += np.sum([pricing["retrieval_rates"][type_ids[tier]][:, None] * reaccessed[tier]
+                               for tier in tiers], axis=(0, 2))
+    costs = storage_cost["tier1"] + storage_cost["tier2"] + reaccess_cost
+    return {
+        "names": names,
+        "accounts": accounts,
+        "samples_run": np.array([o["samples_run"] for o in occupancy]),
+        "total_gb_stored": np.array([o["total_gb_stored"] for o in occupancy]),
+        "total_stored": stored["tier1"] + stored["tier2"],
+        "tier1_storage_cost": storage_cost["tier1"],
+        "tier2_storage_cost": storage_cost["tier2"],
+        "reaccess_cost": reaccess_cost,
+        "costs": costs,
+        "standalone_lifetime_cost": standalone_cost,
+        "fleet_costs": costs.sum(axis=0),
+    }
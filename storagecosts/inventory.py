@@ -0,0 +1,204 @@
+import csv
+import gzip
+import io
+import itertools
+import time
+import warnings
+from collections import namedtuple
+
+import numpy as np
+
+from storagecosts.pricing import pricing
+
+# Existing data to start a simulation from, read from a storage inventory: an
+# S3 Inventory CSV (no header; bucket, key, size, last modified date, storage
+# class, ...) or any CSV with a header naming at least a size column. Rows are
+# read in chunks and aggregated with numpy into GB per storage class and age
+# in months, so memory use does not grow with the number of objects.
+# Objects in storage classes the catalog has no price for are counted in the
+# default storage class; `remapped` gives the number of rows per such class,
+# and reading the inventory warns about them.
+
+Cohorts = namedtuple("Cohorts", ["storage_types", "gb", "remapped"])
+
+# S3 Inventory column order when the file has no header
+s3_inventory_columns = {"key": 1, "size": 2, "last_modified": 3, "storage_class": 4}
+
+column_aliases = {
+    "key": ["key", "path", "name", "object"],
+    "size": ["size", "bytes", "size_bytes"],
+    "last_modified": ["last_modified", "last_modified_date", "lastmodifieddate", "modified", "mtime"],
+    "storage_class": ["storage_class", "storageclass", "class", "tier"],
+}
+
+# provider storage class names -> pricing catalog names
+storage_class_names = {
+    "STANDARD": "S3",
+    "REDUCED_REDUNDANCY": "S3",
+    "STANDARD_IA": "S3IA",
+    "ONEZONE_IA": "S3IASAZ",
+    "GLACIER": "glacier",
+    "DEEP_ARCHIVE": "deepglacier",
+    # closest priced class: Intelligent-Tiering's frequent tier and Outposts
+    # bill like Standard, Glacier Instant Retrieval stores at Glacier's price
+    "INTELLIGENT_TIERING": "S3",
+    "OUTPOSTS": "S3",
+    "EXPRESS_ONEZONE": "S3",
+    "GLACIER_IR": "glacier",
+}
+
+bytes_per_gb = 1024. ** 3
+
+# older objects are counted as this old
+max_age_months = 1200
+
+
+def open_inventory(path):
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), newline="")
+    return open(path, newline="")
+
+def find_columns(header):
+    # column positions from a header row, or None if it isn't one
+    names = [h.strip().lower().replace(" ", "_") for h in header]
+    columns = {}
+    for column, aliases in column_aliases.items():
+        for alias in aliases:
+            if alias in names:
+                columns[column] = names.index(alias)
+                break
+    return columns if "size" in columns else None
+
+def month_numbers(dates):
+    # months since year 0 for ISO dates ("2019-05-12T10:22:33.000Z"), parsed
+    # from the characters of the year and month digits; -1 for dates that
+    # don't start with YYYY-MM
+    codes = np.array(dates, dtype="U7").view(np.uint32).reshape(-1, 7).astype(int)
+    digits = codes - ord("0")
+    valid = ((digits[:, [0, 1, 2, 3, 5, 6]] >= 0) & (digits[:, [0, 1, 2, 3, 5, 6]] <= 9)).all(axis=1)
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 5] * 10 + digits[:, 6]
+    valid &= (codes[:, 4] == ord("-")) & (month >= 1) & (month <= 12)
+    return np.where(valid, year * 12 + month - 1, -1)
+
+def storage_class_ids(classes, default_storage_class, remapped):
+    # catalog ids of the storage classes; rows of unknown classes get the
+    # default's id and are counted in `remapped`
+    names, inverse, counts = np.unique(classes, return_inverse=True, return_counts=True)
+    ids = []
+    for name, count in zip(names, counts):
+        name = name or default_storage_class
+        catalog_name = storage_class_names.get(name.upper(), name)
+        if catalog_name not in pricing["storage_type_index"]:
+            remapped[name] = remapped.get(name, 0) + int(count)
+            catalog_name = default_storage_class
+        ids.append(pricing["storage_type_index"][catalog_name])
+    return np.array(ids, dtype=int)[inverse.ravel()]
+
+def read_inventory(path, as_of=None, chunk_rows=100000, columns=None, default_storage_class="S3",
+                   suffixes=None):
+    # Cohorts of the inventory at `path` (.csv or .csv.gz): GB per storage
+    # class and age in months at `as_of` ((year, month), default: this
+    # month). `columns` maps key/size/last_modified/storage_class to column
+    # positions for files without a header; `suffixes` keeps only objects
+    # whose key ends with one of them (e.g. (".bam", ".cram")). Dates that
+    # can't be read or are later than `as_of` raise a ValueError naming the
+    # row.
+    if as_of is None:
+        now = time.gmtime()
+        as_of = (now.tm_year, now.tm_mon)
+    now_month = as_of[0] * 12 + as_of[1] - 1
+    storage_types = pricing["storage_types"]
+    if default_storage_class not in pricing["storage_type_index"]:
+        raise ValueError("unknown storage type %r" % (default_storage_class,))
+    gb = np.zeros((len(storage_types), max_age_months + 1))
+    remapped = {}
+
+    with open_inventory(path) as f:
+        reader = csv.reader(f)
+        first = next(reader, None)
+        if first is None:
+            return Cohorts(storage_types, gb, remapped)
+        header = find_columns(first)
+        if columns is None:
+            columns = header or s3_inventory_columns
+        pending = [] if header else [first]
+        # row number of the first row of each chunk, counting from 1
+        row_number = 2 if header else 1
+        while True:
+            rows = pending + list(itertools.islice(reader, chunk_rows - len(pending)))
+            pending = []
+            if not rows:
+                break
+            add_chunk(gb, rows, columns, now_month, default_storage_class, suffixes, remapped, row_number)
+            row_number += len(rows)
+    if remapped:
+        warnings.warn("%d inventory rows in storage classes without prices (%s) were counted as %s" % (
+            sum(remapped.values()), ", ".join("%s: %d" % kv for kv in sorted(remapped.items())),
+            default_storage_class))
+    return Cohorts(storage_types, gb, remapped)
+
+def add_chunk(gb, rows, columns, now_month, default_storage_class, suffixes, remapped, first_row=1):
+    width = max(columns.values()) + 1
+    row_numbers = np.array([first_row + i for i, row in enumerate(rows) if len(row) >= width], dtype=int)
+    rows = [row for row in rows if len(row) >= width]
+    if not rows:
+        return
+    cells = list(zip(*rows))
+    keep = np.ones(len(rows), dtype=bool)
+    if suffixes and "key" in columns:
+        keys = np.char.lower(np.array(cells[columns["key"]]))
+        keep = np.zeros(len(rows), dtype=bool)
+        for suffix in suffixes:
+            keep |= np.char.endswith(keys, suffix.lower())
+
+    sizes = np.array(cells[columns["size"]])[keep]
+    sizes = np.where(sizes == "", "0", sizes).astype(float) / bytes_per_gb
+    if "last_modified" in columns:
+        dates = np.char.strip(np.array(cells[columns["last_modified"]])[keep])
+        # objects without a date are counted as new
+        dated = np.char.str_len(dates) > 0
+        months = month_numbers(np.where(dated, dates, "0000-01"))
+        ages = np.where(dated, now_month - months, 0)
+        malformed = dated & (months < 0)
+        if malformed.any():
+            i = np.argmax(malformed)
+            raise ValueError("inventory row %d: malformed last_modified date %r" % (
+                row_numbers[keep][i], str(dates[i])))
+        future = dated & (ages < 0)
+        if future.any():
+            i = np.argmax(future)
+            raise ValueError("inventory row %d: last_modified date %r is after %04d-%02d" % (
+                row_numbers[keep][i], str(dates[i]), now_month // 12, now_month % 12 + 1))
+        ages = np.minimum(ages, max_age_months)
+    else:
+        ages = np.zeros(len(sizes), dtype=int)
+    if "storage_class" in columns:
+        type_ids = storage_class_ids(np.array(cells[columns["storage_class"]])[keep], default_storage_class,
+                                     remapped)
+    else:
+        type_ids = np.full(len(sizes), pricing["storage_type_index"][default_storage_class])
+    gb += np.bincount(type_ids * gb.shape[1] + ages, weights=sizes, minlength=gb.size).reshape(gb.shape)
+
+def tier_cohorts(cohorts, scenario):
+    # (tier1, tier2) GB by age in months for a scenario. Data in the
+    # scenario's tier1 or tier2 storage type stays in that tier; data in any
+    # other storage class is assigned to the tier the retention policy puts
+    # data of its age in.
+    index = pricing["storage_type_index"]
+    tier1_id, tier2_id = index[scenario["tier1_storage_type"]], index[scenario["tier2_storage_type"]]
+    ages = np.arange(cohorts.gb.shape[1])
+    other = np.ones(len(cohorts.gb), dtype=bool)
+    other[[tier1_id, tier2_id]] = False
+    unplaced = cohorts.gb[other].sum(axis=0)
+    young = ages < scenario["retention_time_tier1"]
+    tier1 = np.where(young, unplaced, 0.)
+    tier2 = np.where(young, 0., unplaced)
+    if tier1_id == tier2_id:
+        # the class alone can't tell the tiers apart, so age decides
+        tier1 = tier1 + np.where(young, cohorts.gb[tier1_id], 0.)
+        tier2 = tier2 + np.where(young, 0., cohorts.gb[tier1_id])
+    else:
+        tier1 = tier1 + cohorts.gb[tier1_id]
+        tier2 = tier2 + cohorts.gb[tier2_id]
+    return tier1, tier2
@@ -0,0 +1,80 @@
+import numpy as np
+
+from storagecosts.engine import monthly_volumes, monthly_reaccess_gb, split_by_share, price_tier
+from storagecosts.pricing import storage_type_id
+
+# A lifecycle policy is an ordered list of (storage type, retention months)
+# stages, e.g. [("S3", 12), ("S3IA", 24), ("glacier", 60), ("deepglacier", 120)].
+# Every monthly cohort spends exactly `retention` months in each stage and is
+# deleted after the last one; a retention of None keeps data in that (last)
+# stage forever. The cohorts are held as their cumulative volume, so the GB
+# in a stage at any month is one lagged difference: O(stages) per month,
+# however long the history. Unlike tier_occupancy, which keeps the original
+# loop's indexing, no cohort is special and stages last their full retention.
+
+
+def stage_boundaries(retentions):
+    # age in months at which a cohort leaves each stage
+    if any(r is None for r in retentions[:-1]):
+        raise ValueError("only the last lifecycle stage can keep data forever")
+    if any(r is not None and r < 0 for r in retentions):
+        raise ValueError("retention times cannot be negative")
+    return np.cumsum([np.inf if r is None else r for r in retentions])
+
+
+def lifecycle_occupancy(monthly_gb, retentions):
+    # The GB in a stage at month t is the volume of the cohorts aged between
+    # the stage's boundaries, i.e. a lagged difference of the cumulative
+    # volume. Returns an array of (stages, ..., months).
+    monthly_gb = np.asarray(monthly_gb, dtype=float)
+    n = monthly_gb.shape[-1]
+    cumulative = np.concatenate((np.zeros(monthly_gb.shape[:-1] + (1,)), np.cumsum(monthly_gb, axis=-1)), axis=-1)
+    timepoints = np.arange(1, n + 1)
+
+    def arrived_before(age):
+        # total volume of cohorts at least `age` months old at each month
+        idx = np.clip(timepoints - np.minimum(age, n + 1), 0, n).astype(int)
+        return cumulative[..., idx]
+
+    boundaries = np.concatenate(([0], stage_boundaries(retentions)))
+    received = [arrived_before(b) for b in boundaries]
+    return np.array([received[j] - received[j + 1] for j in range(len(boundaries) - 1)])
+
+
+def parse_stages(text):
+    # "S3:12,S3IA:24,glacier" -> [("S3", 12), ("S3IA", 24), ("glacier", None)]
+    stages = []
+    for part in text.split(","):
+        storage_type, _, retention = part.strip().partition(":")
+        storage_type_id(storage_type)
+        stages.append((storage_type, int(retention) if retention else None))
+    stage_boundaries([retention for storage_type, retention in stages])
+    return stages
+
+def simulate_lifecycle(scenario, stages):
+    # Cost model of `scenario` under an N-stage lifecycle policy. The
+    # scenario's retention times and tier storage types are replaced by
+    # `stages`; volumes, growth and re-access are used as in simulate().
+    storage_types = [storage_type for storage_type, retention in stages]
+    samples_run, monthly_gb = monthly_volumes(scenario)
+    stored = lifecycle_occupancy(monthly_gb, [retention for storage_type, retention in stages])
+    reaccessed = split_by_share(monthly_reaccess_gb(scenario), list(stored))
+
+    storage_costs, reaccess_costs = [], []
+    for storage_type, stage_stored, stage_reaccessed in zip(storage_types, stored, reaccessed):
+        storage_cost, reaccess_cost = price_tier(storage_type, stage_stored, stage_reaccessed, scenario["reaccess_target"])
+        storage_costs.append(storage_cost)
+        reaccess_costs.append(reaccess_cost)
+    storage_costs = np.array(storage_costs)
+    reaccess_cost = np.sum(reaccess_costs, axis=0)
+
+    return {
+        "storage_types": storage_types,
+        "total_gb_stored": monthly_gb,
+        "samples_run": samples_run,
+        "stage_stored": stored,
+        "stage_storage_cost": storage_costs,
+        "total_stored": stored.sum(axis=0),
+        "reaccess_cost": reaccess_cost,
+        "costs": storage_costs.sum(axis=0) + reaccess_cost,
+    }
@@ -0,0 +1,84 @@
+import numpy as np
+
+from storagecosts.engine import simulate, resample
+
+# Distributions are given per parameter as (name, *args), with the arguments
+# of the numpy.random method of the same name, e.g. ("normal", 5, 2) for a
+# growth rate of 5 +/- 2 percent. "constant" fixes a parameter to a value.
+distribution_names = ["constant", "normal", "uniform", "triangular", "lognormal"]
+
+# Parameters that can be drawn. Sizes and reaccess counts are absolute values;
+# `compression` is a factor applied to all test sizes at once (so it is
+# correlated across test types, unlike the per-type size draws).
+sampled_parameters = ["volume_growth", "reaccess_count", "genome_size", "exome_size", "panel_size", "compression"]
+
+non_negative_parameters = ["reaccess_count", "genome_size", "exome_size", "panel_size", "compression"]
+
+percentiles = [10, 50, 90]
+
+
+def draw(random_state, distribution, trials):
+    name, args = distribution[0], distribution[1:]
+    if name not in distribution_names:
+        raise ValueError("unknown distribution %r" % name)
+    if name == "constant":
+        return np.full(trials, float(args[0]))
+    return getattr(random_state, name)(*args, size=trials)
+
+
+def sample_parameters(scenario, distributions, trials, seed=0):
+    # one array of `trials` values per sampled parameter; parameters without
+    # a distribution keep the scenario's value
+    unknown = set(distributions) - set(sampled_parameters)
+    if unknown:
+        raise ValueError("cannot sample: %s" % ", ".join(sorted(unknown)))
+    random_state = np.random.RandomState(seed)
+    samples = {}
+    # draw in a fixed order so results only depend on the seed
+    for parameter in sampled_parameters:
+        if parameter in distributions:
+            values = draw(random_state, distributions[parameter], trials)
+            if parameter in non_negative_parameters:
+                values = np.maximum(values, 0.)
+            samples[parameter] = values
+    return samples
+
+
+def trial_scenario(scenario, samples, start, stop):
+    # scenario for trials start..stop, with array values for drawn parameters
+    batch = dict(scenario)
+    for parameter, values in samples.items():
+        if parameter != "compression":
+            batch[parameter] = values[start:stop]
+    if "compression" in samples:
+        for size in ["genome_size", "exome_size", "panel_size"]:
+            batch[size] = batch[size] * samples["compression"][start:stop]
+    return batch
+
+
+def simulate_trials(scenario, distributions, trials=1000, seed=0, interval=1,
+                    series=("costs", "total_stored"), chunk_size=500):
+    # Simulate `trials` draws of the scenario as (trials x months) arrays,
+    # `chunk_size` trials at a time to bound memory. Returns each of `series`
+    # resampled to `interval` months, plus the lifetime cost of every trial.
+    samples = sample_parameters(scenario, distributions, trials, seed)
+    results = {name: [] for name in series}
+    lifetime_costs = []
+    for start in range(0, trials, chunk_size):
+        stop = min(start + chunk_size, trials)
+        monthly = simulate(trial_scenario(scenario, samples, start, stop))
+        for name in series:
+            values = np.broadcast_to(monthly[name], (stop - start, scenario["months"]))
+            results[name].append(resample(values, interval, "max" if name == "total_stored" else "sum"))
+        lifetime_costs.append(np.broadcast_to(monthly["costs"], (stop - start, scenario["months"])).sum(axis=-1))
+    results = {name: np.concatenate(chunks, axis=0) for name, chunks in results.items()}
+    results["lifetime_cost"] = np.concatenate(lifetime_costs)
+    return results
+
+
+def percentile_bands(scenario, distributions, trials=1000, seed=0, interval=1, series=("costs",)):
+    # P10/P50/P90 of each series at every timepoint, and of the lifetime cost
+    results = simulate_trials(scenario, distributions, trials, seed, interval, series)
+    bands = {name: np.percentile(results[name], percentiles, axis=0) for name in series}
+    bands["lifetime_cost"] = np.percentile(results["lifetime_cost"], percentiles)
+    return bands
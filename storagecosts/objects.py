@@ -0,0 +1,179 @@
+from collections import namedtuple
+
+import numpy as np
+
+from storagecosts.daily import days_per_month
+from storagecosts.engine import price_tier
+from storagecosts.pricing import pricing, storage_type_id
+
+# Object-level variant of simulate(). Every test writes discrete objects (an
+# alignment and its index) whose sizes vary around the test size, so charges
+# that depend on object counts can be priced: write, transition and read
+# requests, minimum billable object sizes and early deletion. Objects are kept
+# as a struct of typed arrays laid out by creation month, so each month's
+# cohort is a contiguous slice: lifecycle moves are masks over the cohorts
+# reaching a tier boundary, and re-accesses sample tests uniformly from the
+# range of tests still stored. Objects take 10 bytes each (100 MB for 10^7).
+#
+# Like simulate_daily, data spends exactly its retention in each tier: a
+# cohort created in month c is in tier1 for months c .. c+r1-1 and in tier2
+# for the next r2 months.
+
+Objects = namedtuple("Objects", ["size_gb", "created", "tier", "access_count", "test_type"])
+
+test_types = ["genome", "exome", "panel"]
+
+# objects written per test: the alignment and its index (.bai/.crai), which
+# is this share of the test size
+files_per_test = 2
+index_fraction = 1e-4
+
+# values of Objects.tier
+deleted, tier1, tier2 = 0, 1, 2
+
+
+def test_counts(scenario, random_state):
+    # tests of each type run each month, as Poisson counts around the
+    # monthly model's expected numbers (types x months)
+    growth = (1 + scenario["volume_growth"]/12./100) ** np.arange(scenario["months"])
+    expected = np.array([scenario[tt + "_count"] for tt in test_types], dtype=float)[:, None] / 12. * growth
+    return random_state.poisson(expected)
+
+def allocate_objects(n_objects, months):
+    created_dtype = np.int16 if months <= np.iinfo(np.int16).max else np.int32
+    return Objects(
+        size_gb=np.zeros(n_objects, dtype=np.float32),
+        created=np.zeros(n_objects, dtype=created_dtype),
+        tier=np.zeros(n_objects, dtype=np.int8),
+        access_count=np.zeros(n_objects, dtype=np.uint16),
+        test_type=np.zeros(n_objects, dtype=np.int8),
+    )
+
+def write_cohort(objects, scenario, counts, month, start, tier, random_state, size_spread):
+    # fill the objects of `month`'s tests, grouped by test type, from object
+    # `start`; each test's alignment and index are adjacent
+    types = np.repeat(np.arange(len(test_types), dtype=np.int8), counts)
+    stop = start + files_per_test * len(types)
+    sizes = np.array([scenario[tt + "_size"] for tt in test_types], dtype=float)[types]
+    # lognormal spread with a mean of 1, so totals match the test sizes
+    sizes = sizes * random_state.lognormal(-size_spread ** 2 / 2, size_spread, len(types))
+    objects.size_gb[start:stop] = np.stack([sizes * (1 - index_fraction), sizes * index_fraction], axis=1).ravel()
+    objects.test_type[start:stop] = np.repeat(types, files_per_test)
+    objects.created[start:stop] = month
+    objects.tier[start:stop] = tier
+    return stop
+
+def tier_plan(scenario):
+    # storage class id, retention in months, and the days the data spends in
+    # that storage class (consecutive tiers in the same class count together)
+    ids = [storage_type_id(scenario["tier1_storage_type"]), storage_type_id(scenario["tier2_storage_type"])]
+    retentions = [scenario["retention_time_tier1"], scenario["retention_time_tier2"]]
+    days_in_class = [r * days_per_month for r in retentions]
+    if ids[0] == ids[1]:
+        days_in_class = [sum(days_in_class)] * 2
+    return ids, retentions, days_in_class
+
+def simulate_objects(scenario, seed=0, size_spread=0.25):
+    # same series as simulate() plus request and early deletion costs (also
+    # included in `costs`, early deletion within the tier storage costs) and
+    # the number of objects stored; "objects" is the final state of every
+    # object written
+    random_state = np.random.RandomState(seed)
+    months = scenario["months"]
+    counts = test_counts(scenario, random_state)
+    tests_per_month = counts.sum(axis=0)
+    test_offsets = np.concatenate(([0], np.cumsum(tests_per_month)))
+    objects = allocate_objects(files_per_test * int(test_offsets[-1]), months)
+
+    ids, retentions, days_in_class = tier_plan(scenario)
+    boundaries = np.cumsum(retentions)
+    minimum_gb = pricing["minimum_object_gb"][ids]
+    write_rates, read_rates = pricing["request_rates"][ids].T
+
+    def tier_at_age(age):
+        return tier1 if age < boundaries[0] else tier2 if age < boundaries[1] else deleted
+
+    created = np.zeros(months)
+    stored = np.zeros((2, months))
+    reaccessed = np.zeros((2, months))
+    object_count = np.zeros(2, dtype=np.int64)
+    objects_stored = np.zeros(months, dtype=np.int64)
+    billable = np.zeros(2)
+    request_cost = np.zeros(months)
+    early_cost = np.zeros((2, months))
+    monthly_reaccess_tests = scenario["reaccess_count"] / 12.
+
+    def enter(objects_slice, tier, month, transition):
+        sizes = objects.size_gb[objects_slice][objects.tier[objects_slice] == tier]
+        billable[tier - 1] += np.maximum(sizes, minimum_gb[tier - 1]).sum(dtype=np.float64)
+        object_count[tier - 1] += len(sizes)
+        if transition is None or ids[transition - 1] != ids[tier - 1]:
+            request_cost[month] += len(sizes) * write_rates[tier - 1]
+
+    for month in range(months):
+        # cohorts reaching the end of tier2, then of tier1, move on
+        for tier in [tier2, tier1]:
+            cohort = month - int(boundaries[tier - 1])
+            if retentions[tier - 1] <= 0 or cohort < 0:
+                continue
+            cohort_objects = slice(files_per_test * test_offsets[cohort], files_per_test * test_offsets[cohort + 1])
+            leaving = objects.tier[cohort_objects] == tier
+            sizes = np.maximum(objects.size_gb[cohort_objects][leaving], minimum_gb[tier - 1])
+            billable[tier - 1] -= sizes.sum(dtype=np.float64)
+            object_count[tier - 1] -= len(sizes)
+            next_tier = tier_at_age(boundaries[tier - 1])
+            shortfall = pricing["minimum_days"][ids[tier - 1]] - days_in_class[tier - 1]
+            if shortfall > 0 and (next_tier == deleted or ids[next_tier - 1] != ids[tier - 1]):
+                early_cost[tier - 1, month] += sizes.sum(dtype=np.float64) * \
+                    shortfall / days_per_month * pricing["storage_base_rates"][ids[tier - 1]]
+            objects.tier[cohort_objects][leaving] = next_tier
+            if next_tier != deleted:
+                enter(cohort_objects, next_tier, month, tier)
+
+        # this month's tests
+        first_tier = tier_at_age(0)
+        new_objects = slice(files_per_test * test_offsets[month], files_per_test * test_offsets[month + 1])
+        write_cohort(objects, scenario, counts[:, month], month, new_objects.start, first_tier,
+                     random_state, size_spread)
+        created[month] = objects.size_gb[new_objects].sum(dtype=np.float64)
+        if first_tier != deleted:
+            enter(new_objects, first_tier, month, None)
+        # storage is billed on the billable size of the objects held
+        stored[:, month] = billable
+        objects_stored[month] = object_count.sum()
+
+        # re-accessed tests are drawn from those still stored, which are a
+        # contiguous range of tests; every object of a test is read
+        first_stored = test_offsets[max(month - int(boundaries[1]) + 1, 0)]
+        last_stored = test_offsets[month + 1]
+        if boundaries[1] > 0 and last_stored > first_stored:
+            tests = random_state.randint(first_stored, last_stored,
+                                         random_state.poisson(monthly_reaccess_tests))
+            read = (files_per_test * tests[:, None] + np.arange(files_per_test)).ravel()
+            np.add.at(objects.access_count, read, 1)
+            read_tiers = objects.tier[read]
+            reaccessed[:, month] = np.bincount(read_tiers, weights=objects.size_gb[read], minlength=3)[1:]
+            reads = np.bincount(read_tiers, minlength=3)[1:]
+            request_cost[month] += np.dot(reads, read_rates)
+
+    costs = {}
+    for tier in ["tier1", "tier2"]:
+        i = 0 if tier == "tier1" else 1
+        storage_cost, reaccess_cost = price_tier(scenario[tier + "_storage_type"], stored[i], reaccessed[i],
+                                                 scenario["reaccess_target"])
+        costs[tier] = storage_cost + early_cost[i], reaccess_cost
+
+    reaccess_cost = costs["tier1"][1] + costs["tier2"][1]
+    return {
+        "total_gb_stored": created,
+        "total_stored": stored[0] + stored[1],
+        "samples_run": tests_per_month.astype(float),
+        "tier1_storage_cost": costs["tier1"][0],
+        "tier2_storage_cost": costs["tier2"][0],
+        "early_deletion_cost": early_cost[0] + early_cost[1],
+        "reaccess_cost": reaccess_cost,
+        "request_cost": request_cost,
+        "costs": costs["tier1"][0] + costs["tier2"][0] + reaccess_cost + request_cost,
+        "objects_stored": objects_stored,
+        "objects": objects,
+    }
@@ -0,0 +1,75 @@
+import numpy as np
+
+from storagecosts.engine import monthly_volumes, monthly_reaccess_gb, tier_occupancy, split_by_share, price_tiers
+from storagecosts.pricing import storage_type_id
+
+# Best split of a fixed total retention between tier1 and tier2. Every split
+# point (1..total months in tier1; with the engine's indexing a tier1
+# retention of 1 already sends all but the first month's data straight to
+# tier2) is evaluated at once: the cumulative volume is computed once and
+# each split is a different lag into it, so occupancy is a (splits x months)
+# array. Each storage type is then priced once per tier over all splits, and
+# the cost of a pair at a split is the sum of its tier1 and tier2 costs, so
+# adding candidate pairs costs next to nothing.
+
+
+def split_costs(scenario, storage_types, total_retention):
+    # lifetime cost of each storage type as tier1 and as tier2, as arrays of
+    # (types x splits), where split i keeps data in tier1 for i months
+    splits = np.arange(1, total_retention + 1)
+    samples_run, monthly_gb = monthly_volumes(scenario)
+    tier1, tier2 = tier_occupancy(monthly_gb, splits, total_retention - splits)
+    tier1_reaccessed, tier2_reaccessed = split_by_share(monthly_reaccess_gb(scenario), [tier1, tier2])
+    type_ids = np.array([storage_type_id(t) for t in storage_types], dtype=int)
+
+    def lifetime_costs(stored, reaccessed):
+        storage_cost, reaccess_cost = price_tiers(type_ids, stored, reaccessed, scenario["reaccess_target"])
+        return storage_cost.sum(axis=-1) + reaccess_cost.sum(axis=-1)
+
+    return splits, lifetime_costs(tier1, tier1_reaccessed), lifetime_costs(tier2, tier2_reaccessed)
+
+def optimize_retention_split(scenario, pairs=None, total_retention=None):
+    # Lifetime cost of every split of `total_retention` months (default: the
+    # scenario's tier1 + tier2 retention) for each (tier1, tier2) storage type
+    # pair (default: the scenario's pair). Returns the cost matrix (pairs x
+    # splits), the cheapest policy, and the savings of every split against
+    # the scenario's own policy.
+    if pairs is None:
+        pairs = [(scenario["tier1_storage_type"], scenario["tier2_storage_type"])]
+    # the scenario's own split, with tier1 retentions under a month counting as 1
+    current_split = max(int(scenario["retention_time_tier1"]), 1)
+    if total_retention is None:
+        total_retention = current_split + scenario["retention_time_tier2"]
+    total_retention = int(total_retention)
+    if total_retention < 1:
+        raise ValueError("the total retention must be at least 1 month")
+    storage_types = sorted(set(t for pair in pairs for t in pair))
+    index = {t: i for i, t in enumerate(storage_types)}
+    splits, tier1_costs, tier2_costs = split_costs(scenario, storage_types, total_retention)
+
+    cost_matrix = np.array([tier1_costs[index[t1]] + tier2_costs[index[t2]] for t1, t2 in pairs])
+    best_pair, best_split = np.unravel_index(np.argmin(cost_matrix), cost_matrix.shape)
+
+    current_pair = (scenario["tier1_storage_type"], scenario["tier2_storage_type"])
+    if current_pair in pairs and scenario["retention_time_tier2"] == total_retention - current_split:
+        current_cost = float(cost_matrix[pairs.index(current_pair), current_split - 1])
+    else:
+        current_cost = None
+
+    best_costs = cost_matrix.min(axis=0)
+    return {
+        "pairs": pairs,
+        "splits": splits,
+        "cost_matrix": cost_matrix,
+        "best": {
+            "tier1_storage_type": pairs[best_pair][0],
+            "tier2_storage_type": pairs[best_pair][1],
+            "retention_time_tier1": int(splits[best_split]),
+            "retention_time_tier2": int(total_retention - splits[best_split]),
+            "lifetime_cost": float(cost_matrix[best_pair, best_split]),
+        },
+        "current_cost": current_cost,
+        # cheapest pair at each split, and its savings over the current policy
+        "best_costs": best_costs,
+        "savings": current_cost - best_costs if current_cost is not None else None,
+    }
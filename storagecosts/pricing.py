@@ -0,0 +1,162 @@
+from collections import namedtuple
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+CostCurve = namedtuple("CostCurve", ["breakpoints", "starts", "base_costs", "rates", "rate_steps"])
+
+# curves with up to this many breakpoints are evaluated as a sum of hinge
+# functions, which avoids the searchsorted lookup and gathers on big arrays
+max_hinge_breakpoints = 8
+
+def compile_cost_buckets(cost_buckets: list):
+    # cost buckets are [[size, price/GB], ...]; the first `size` GB are billed
+    # at the first price, the next `size` GB at the second, and so on. The last
+    # bucket applies to everything beyond. Compile them once into the start of
+    # each bucket and the total cost of all buckets below it.
+    sizes = np.array([b[0] for b in cost_buckets[:-1]], dtype=float)
+    rates = np.array([b[1] for b in cost_buckets], dtype=float)
+    breakpoints = np.cumsum(sizes)
+    starts = np.concatenate(([0.], breakpoints))
+    base_costs = np.concatenate(([0.], np.cumsum(sizes * rates[:-1])))
+    return CostCurve(breakpoints, starts, base_costs, rates, np.diff(rates))
+
+def calc_cost_curve(curve: CostCurve, amount):
+    # piecewise linear cost for a scalar or a whole array of GB amounts
+    amount = np.asarray(amount, dtype=float)
+    if len(curve.breakpoints) <= max_hinge_breakpoints:
+        cost = curve.rates[0] * amount
+        if len(curve.breakpoints):
+            excess = np.empty_like(amount)
+        for breakpoint, rate_step in zip(curve.breakpoints, curve.rate_steps):
+            np.subtract(amount, breakpoint, out=excess)
+            np.maximum(excess, 0., out=excess)
+            excess *= rate_step
+            cost += excess
+        return cost[()]
+    idx = np.searchsorted(curve.breakpoints, amount, side='left')
+    cost = curve.base_costs[idx] + curve.rates[idx] * (amount - curve.starts[idx])
+    return cost[()]
+
+def calc_cost(cost_buckets: list, amount):
+    return calc_cost_curve(compile_cost_buckets(cost_buckets), amount)
+
+
+# Prices live in a catalog (pricing.json next to this module, or the file named
+# by STORAGECOSTS_PRICING). Per storage class it lists the storage buckets, the
+# retrieval price per GB, the egress table used for transfers out, the
+# minimum storage duration in days, the price per 1000 write and read
+# requests, and the minimum billable object size in KB (used by the
+# object-level model); a bucket size of null means unlimited.
+# `destinations` says whether re-accessing data to a destination is billed
+# at the egress price.
+# The catalog is compiled once into arrays indexed by storage class id.
+default_catalog_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pricing.json")
+
+def buckets_from_catalog(buckets):
+    return [[np.inf if size is None else size, price] for size, price in buckets]
+
+def load_catalog(path=None):
+    path = path or os.environ.get("STORAGECOSTS_PRICING") or default_catalog_path
+    with open(path, "rb") as f:
+        raw = f.read()
+    catalog = json.loads(raw.decode("utf-8"))
+    catalog["version"] = hashlib.sha1(raw).hexdigest()[:12]
+    return catalog
+
+def compile_catalog(catalog):
+    classes = catalog["storage_classes"]
+    storage_types = list(classes)
+    egress_tables = list(catalog["egress"])
+    for name, spec in classes.items():
+        if spec["egress"] not in catalog["egress"]:
+            raise ValueError("storage class %r uses unknown egress table %r" % (name, spec["egress"]))
+    storage_buckets = {k: buckets_from_catalog(classes[k]["storage"]) for k in storage_types}
+    storage_curves = [compile_cost_buckets(storage_buckets[k]) for k in storage_types]
+
+    # all storage curves padded to the same number of breakpoints, so that
+    # every class can be priced at once; padding never kicks in (an infinite
+    # breakpoint with no change of rate)
+    width = max(len(c.breakpoints) for c in storage_curves)
+    storage_breakpoints = np.full((len(storage_types), width), np.inf)
+    storage_rate_steps = np.zeros((len(storage_types), width))
+    for i, curve in enumerate(storage_curves):
+        storage_breakpoints[i, :len(curve.breakpoints)] = curve.breakpoints
+        storage_rate_steps[i, :len(curve.rate_steps)] = curve.rate_steps
+
+    transfer_buckets = {k: buckets_from_catalog(v) for k, v in catalog["egress"].items()}
+    return {
+        "version": catalog.get("version"),
+        "storage_types": storage_types,
+        "storage_type_index": {k: i for i, k in enumerate(storage_types)},
+        "storage_buckets": storage_buckets,
+        "storage_curves": storage_curves,
+        "storage_base_rates": np.array([c.rates[0] for c in storage_curves]),
+        "storage_breakpoints": storage_breakpoints,
+        "storage_rate_steps": storage_rate_steps,
+        "retrieval_rates": np.array([classes[k]["retrieval"] for k in storage_types], dtype=float),
+        "minimum_days": np.array([classes[k].get("minimum_days", 0) for k in storage_types], dtype=float),
+        # (write, read) price per request
+        "request_rates": np.array([classes[k].get("requests", [0, 0]) for k in storage_types], dtype=float) / 1000.,
+        "minimum_object_gb": np.array([classes[k].get("minimum_object_kb", 0) for k in storage_types],
+                                      dtype=float) / 1024. ** 2,
+        "egress_tables": egress_tables,
+        "egress_index": np.array([egress_tables.index(classes[k]["egress"]) for k in storage_types], dtype=int),
+        "transfer_buckets": transfer_buckets,
+        "transfer_curves": [compile_cost_buckets(transfer_buckets[k]) for k in egress_tables],
+        "destinations": dict(catalog["destinations"]),
+        "compression": dict(catalog["compression"]),
+    }
+
+pricing = compile_catalog(load_catalog())
+catalog_version = pricing["version"]
+
+storage_cost_buckets = pricing["storage_buckets"]
+transfer_cost_buckets = pricing["transfer_buckets"]
+storage_cost_curves = dict(zip(pricing["storage_types"], pricing["storage_curves"]))
+transfer_cost_curves = dict(zip(pricing["egress_tables"], pricing["transfer_curves"]))
+
+def storage_type_id(storage_type):
+    try:
+        return pricing["storage_type_index"][storage_type]
+    except KeyError:
+        raise ValueError("unknown storage type %r" % (storage_type,))
+
+def bills_egress(destination):
+    try:
+        return pricing["destinations"][destination]
+    except KeyError:
+        raise ValueError("unknown reaccess destination %r" % (destination,))
+
+def calc_storage_cost(storage_type, gb):
+    return calc_cost_curve(pricing["storage_curves"][storage_type_id(storage_type)], gb)
+
+def calc_storage_costs(type_ids, gb):
+    # storage cost of `gb` for each of the storage class ids `type_ids` at
+    # once, as an array of shape (len(type_ids),) + gb.shape
+    gb = np.asarray(gb, dtype=float)
+    type_ids = np.asarray(type_ids, dtype=int)
+    expand = (slice(None),) + (None,) * gb.ndim
+    cost = pricing["storage_base_rates"][type_ids][expand] * gb
+    for breakpoints, rate_steps in zip(pricing["storage_breakpoints"][type_ids].T,
+                                       pricing["storage_rate_steps"][type_ids].T):
+        cost += rate_steps[expand] * np.maximum(gb - breakpoints[expand], 0.)
+    return cost
+
+def calc_reaccess_cost(storage_type, gb):
+    return pricing["retrieval_rates"][storage_type_id(storage_type)] * gb
+
+def calc_transfer_cost(storage_type, destination, gb):
+    egress = pricing["egress_index"][storage_type_id(storage_type)]
+    if not bills_egress(destination):
+        return 0
+    return calc_cost_curve(pricing["transfer_curves"][egress], gb)
+
+def get_compression_factor(file_type):
+    try:
+        return pricing["compression"][file_type]
+    except KeyError:
+        raise ValueError("Invalid compression type %r" % (file_type,))
@@ -0,0 +1,76 @@
+import numpy as np
+
+from storagecosts.engine import simulate, compare_storage_pairs
+
+# One-at-a-time sensitivity of the lifetime cost: every numeric input is moved
+# down and up by `step` (a fraction of its value) while the others keep the
+# scenario's values. All 2k perturbed scenarios and the base scenario are run
+# as one batch of trials, so volumes, occupancy and pricing are evaluated once
+# over (2k+1 x months) arrays. The horizon is kept fixed.
+
+# (parameter, label); `compression` scales all test sizes together
+sensitivity_inputs = [
+    ("genome_count", "Genomes per year"),
+    ("exome_count", "Exomes per year"),
+    ("panel_count", "Panels per year"),
+    ("compression", "File size (compression)"),
+    ("volume_growth", "Volume growth %"),
+    ("reaccess_count", "Reaccessed samples per year"),
+    ("retention_time_tier1", "Tier 1 retention"),
+    ("retention_time_tier2", "Tier 2 retention"),
+]
+
+# retention times are whole months
+integer_inputs = ["retention_time_tier1", "retention_time_tier2"]
+
+
+def perturbed_batch(scenario, step, inputs):
+    # scenario whose inputs are arrays of 2k+1 trials: the base values, then
+    # each input moved down and up in turn
+    trials = 2 * len(inputs) + 1
+    batch = dict(scenario)
+    compression = np.ones(trials)
+    for i, parameter in enumerate(inputs):
+        if parameter == "compression":
+            values = compression
+            base = 1.
+        else:
+            base = scenario[parameter]
+            values = batch[parameter] = np.full(trials, float(base))
+        values[2 * i + 1] = base * (1 - step)
+        values[2 * i + 2] = base * (1 + step)
+        if parameter in integer_inputs:
+            values[:] = np.round(values)
+    for size in ["genome_size", "exome_size", "panel_size"]:
+        batch[size] = scenario[size] * compression
+    return batch
+
+def sensitivity(scenario, step=0.2, inputs=None, storage_types=None):
+    # lifetime cost with each input moved down (`low`) and up (`high`), and
+    # with the cheapest and priciest storage type for each tier (the other
+    # tier keeping the scenario's type); rows are sorted by swing
+    if inputs is None:
+        inputs = [parameter for parameter, label in sensitivity_inputs]
+    labels = dict(sensitivity_inputs)
+    lifetime_costs = simulate(perturbed_batch(scenario, step, inputs))["costs"].sum(axis=-1)
+    base = float(lifetime_costs[0])
+    rows = [(labels.get(parameter, parameter), float(lifetime_costs[2 * i + 1]), float(lifetime_costs[2 * i + 2]))
+            for i, parameter in enumerate(inputs)]
+
+    # tier choice: one row and one column of the pair comparison
+    pairs = compare_storage_pairs(scenario, storage_types)
+    types = pairs["storage_types"]
+    if scenario["tier1_storage_type"] in types and scenario["tier2_storage_type"] in types:
+        tier1_choices = pairs["cost_matrix"][:, types.index(scenario["tier2_storage_type"])]
+        tier2_choices = pairs["cost_matrix"][types.index(scenario["tier1_storage_type"])]
+        rows.append(("Tier 1 storage type", float(tier1_choices.min()), float(tier1_choices.max())))
+        rows.append(("Tier 2 storage type", float(tier2_choices.min()), float(tier2_choices.max())))
+
+    rows.sort(key=lambda row: abs(row[2] - row[1]), reverse=True)
+    return {
+        "base": base,
+        "step": step,
+        "labels": [row[0] for row in rows],
+        "low": [row[1] for row in rows],
+        "high": [row[2] for row in rows],
+    }
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# test the computations, not the shared result cache or the metrics files
+os.environ.setdefault("STORAGECOSTS_CACHE_SIZE", "0")
+os.environ.setdefault("STORAGECOSTS_METRICS_PATH", "")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
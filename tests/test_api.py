@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def client():
+    return app.app.server.test_client()
+
+def post(client, body, path="/api/v1/simulate"):
+    return client.post(path, data=json.dumps(body), content_type="application/json")
+
+
+def test_simulate(client):
+    response = post(client, {"scenario": {"genome_count": 500, "total_years_simulated": 5}, "interval": 3})
+    assert response.status_code == 200
+    assert len(response.get_json()["results"]) == 1
+
+def test_batch_matches_single(client):
+    scenarios = [{"genome_count": 500}, {"panel_count": 2000, "volume_growth": 20, "retention_time_tier1": 1}]
+    batch = post(client, {"scenarios": scenarios, "columns": "lists"}).get_json()["results"]
+    single = [post(client, {"scenario": s, "columns": "lists"}).get_json()["results"][0] for s in scenarios]
+    assert batch == single
+
+@pytest.mark.parametrize("body", [
+    # intervals must be one of the listed integers
+    {"interval": 3.0},
+    {"interval": True},
+    {"interval": 2},
+    {"interval": "3"},
+    # numbers must be finite and non-negative
+    {"scenario": {"genome_count": float("nan")}},
+    {"scenario": {"genome_count": float("inf")}},
+    {"scenario": {"total_years_simulated": float("inf")}},
+    {"scenario": {"retention_time_tier1": -1}},
+    {"scenario": {"retention_time_tier1": 0}},
+    # month counts are whole numbers
+    {"scenario": {"retention_time_tier1": 2.5}},
+    {"scenario": {"retention_time_tier2": 12.0}},
+    {"scenario": {"months": 12.5}},
+    {"scenario": {"months": -12}},
+    {"scenario": {"genome_size": "120"}},
+    # horizons are capped
+    {"scenario": {"months": 1e8}},
+    {"scenario": {"total_years_simulated": 1e6}},
+    {"scenario": {"retention_time_tier2": 1e7}},
+    {"scenario": {"volume_growth": 1e6}},
+    {"scenario": {"tier1_storage_type": "tape"}},
+    {"scenario": {"unknown_field": 1}},
+    {"scenarios": {"genome_count": 1}},
+    [],
+])
+def test_invalid_requests(client, body):
+    response = post(client, body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+def test_nan_is_not_parsed_into_a_response(client):
+    # NaN is not JSON, but Python's parser accepts it
+    response = client.post("/api/v1/simulate", data='{"scenario": {"genome_count": NaN}}',
+                           content_type="application/json")
+    assert response.status_code == 400
+    assert b"NaN" not in response.data
+
+def test_edge_scenarios(client):
+    for scenario in [{"months": 0}, {"retention_time_tier1": 1, "retention_time_tier2": 0},
+                     {"panel_count": 2000, "volume_growth": 20, "retention_time_tier1": 1}]:
+        response = post(client, {"scenario": scenario, "columns": "lists"})
+        assert response.status_code == 200
+        assert b"NaN" not in response.data
+        for column in response.get_json()["results"][0]["columns"].values():
+            assert min(column, default=0) >= 0
+
+def test_export(client):
+    body = {"scenarios": [{"genome_count": 500}, {"exome_count": 100}], "names": ["a", "b"], "interval": 12}
+    response = post(client, body, "/api/v1/export")
+    assert response.status_code == 200
+    lines = response.data.decode("utf-8").splitlines()
+    assert len(lines) == 3 and lines[1].startswith("a,")
+
+def test_invalid_export(client):
+    assert post(client, {"interval": 0}, "/api/v1/export").status_code == 400
+    assert post(client, {"scenario": {"months": -1}}, "/api/v1/export").status_code == 400
+    assert client.get("/export?scenario=%7B%22months%22%3A%20NaN%7D").status_code == 400
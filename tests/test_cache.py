@@ -0,0 +1,34 @@
+import threading
+
+from app.cache import ResultCache
+from app.metrics import Metrics, cache_samples
+
+
+def test_counts_from_threads(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    cache.set("a", "1")
+
+    def lookups():
+        for i in range(250):
+            cache.get("a")
+            cache.get("b")
+
+    threads = [threading.Thread(target=lookups) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats() == {"hits": 2000, "misses": 2000, "entries": 1}
+
+def test_cache_in_metrics(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    cache.get("a")
+    cache.get_or_compute("a", lambda: "1")
+    cache.get("a")
+    metrics = Metrics("")
+    metrics.register(cache_samples(cache))
+    lines = metrics.render().splitlines()
+    assert "# TYPE storagecosts_cache_hits_total counter" in lines
+    assert "storagecosts_cache_hits_total 1" in lines
+    assert "storagecosts_cache_misses_total 2" in lines
+    assert "storagecosts_cache_entries 1" in lines
@@ -0,0 +1,35 @@
+import json
+
+import numpy as np
+import pytest
+
+from storagecosts.cli import main
+
+
+@pytest.mark.parametrize("suffix", [".npz", ".csv", ".json"])
+def test_failed_run_keeps_output(tmp_path, suffix):
+    scenarios = tmp_path / "scenarios.json"
+    scenarios.write_text(json.dumps([{"genome_count": 500}, {"retention_time_tier1": "x"}]))
+    output = tmp_path / ("out" + suffix)
+    output.write_text("previous")
+    with pytest.raises(ValueError):
+        main([str(scenarios), "-o", str(output)])
+    assert output.read_text() == "previous"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["out" + suffix, "scenarios.json"]
+
+def test_npz_output(tmp_path):
+    scenarios = tmp_path / "scenarios.json"
+    scenarios.write_text(json.dumps([{"genome_count": 500}]))
+    output = tmp_path / "out.npz"
+    assert main([str(scenarios), "-o", str(output)]) == 0
+    with np.load(str(output)) as archive:
+        assert archive["summaries/000000/lifetime_cost"] > 0
+
+@pytest.mark.parametrize("options", [["--interval", "0"], ["--interval", "-3", "--daily"]])
+def test_bad_interval(tmp_path, capsys, options):
+    scenarios = tmp_path / "scenarios.json"
+    scenarios.write_text(json.dumps([{"genome_count": 500}]))
+    with pytest.raises(SystemExit) as exit:
+        main([str(scenarios), "--series"] + options)
+    assert exit.value.code == 2
+    assert "--interval must be at least 1" in capsys.readouterr().err
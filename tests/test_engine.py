@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from storagecosts import (calc_reaccess_cost, calc_storage_cost, calc_transfer_cost, costs_at, make_scenario,
+                          occupancy_at, pricing, resample, simulate, simulate_batch, steady_state)
+
+fields = ["total_stored", "samples_run", "tier1_storage_cost", "tier2_storage_cost", "reaccess_cost", "costs"]
+
+
+def original_loop(scenario):
+    # the month-by-month loop of the original app, before resampling
+    r1, r2 = scenario["retention_time_tier1"], scenario["retention_time_tier2"]
+    counts = [scenario["genome_count"], scenario["exome_count"], scenario["panel_count"]]
+    sizes = [scenario["genome_size"], scenario["exome_size"], scenario["panel_size"]]
+    yearly_total_samples = sum(counts)
+    running_total_samples = yearly_total_samples / 12.
+    running_total_gb = sum(c * s for c, s in zip(counts, sizes)) / 12.
+    monthly_volume_multiplier = 1 + scenario["volume_growth"] / 12. / 100
+    monthly_reaccess_count = scenario["reaccess_count"] / 12.
+    tier1_type, tier2_type, target = (scenario["tier1_storage_type"], scenario["tier2_storage_type"],
+                                      scenario["reaccess_target"])
+
+    series = {field: [] for field in fields}
+    total_gb_stored = []
+    running_total_tier1 = running_total_tier2 = 0
+    for y in range(1, scenario["months"] + 1):
+        total_gb_stored.append(running_total_gb)
+        if y <= r1:
+            running_total_tier1 += running_total_gb
+        elif y <= r1 + r2:
+            running_total_tier1 -= total_gb_stored[y - r1]
+            running_total_tier2 += total_gb_stored[y - r1]
+            running_total_tier1 += running_total_gb
+        else:
+            running_total_tier2 -= total_gb_stored[y - (r1 + r2)]
+            running_total_tier1 -= total_gb_stored[y - r1]
+            running_total_tier2 += total_gb_stored[y - r1]
+            running_total_tier1 += running_total_gb
+
+        tier1_cost = calc_storage_cost(tier1_type, running_total_tier1)
+        tier2_cost = calc_storage_cost(tier2_type, running_total_tier2)
+        reaccess_cost = 0
+        if running_total_tier1 + running_total_tier2 > 0:
+            total_gb_reaccessed = sum(monthly_reaccess_count * c / yearly_total_samples * s
+                                      for c, s in zip(counts, sizes))
+            for storage_type, stored in [(tier1_type, running_total_tier1), (tier2_type, running_total_tier2)]:
+                gb = total_gb_reaccessed * stored / float(running_total_tier1 + running_total_tier2)
+                reaccess_cost += calc_reaccess_cost(storage_type, gb) + calc_transfer_cost(storage_type, target, gb)
+
+        series["tier1_storage_cost"].append(tier1_cost)
+        series["tier2_storage_cost"].append(tier2_cost)
+        series["reaccess_cost"].append(reaccess_cost)
+        series["total_stored"].append(running_total_tier1 + running_total_tier2)
+        series["samples_run"].append(running_total_samples)
+        series["costs"].append(tier1_cost + tier2_cost + reaccess_cost)
+        running_total_gb *= monthly_volume_multiplier
+        running_total_samples *= monthly_volume_multiplier
+    return {field: np.array(values) for field, values in series.items()}
+
+def seeded_scenarios(count=20, seed=0):
+    random = np.random.RandomState(seed)
+    storage_types = pricing["storage_types"]
+    scenarios = []
+    for i in range(count):
+        scenarios.append(make_scenario(
+            genome_count=int(random.choice([0, 50, 2000])), exome_count=int(random.randint(0, 500)),
+            panel_count=int(random.randint(1, 20000)), genome_size=float(random.uniform(20, 150)),
+            volume_growth=float(random.choice([0, 5, 40, -10])), reaccess_count=int(random.randint(0, 1000)),
+            retention_time_tier1=int(random.choice([1, 2, 12, 30])),
+            retention_time_tier2=int(random.choice([0, 1, 24])),
+            tier1_storage_type=storage_types[random.randint(len(storage_types))],
+            tier2_storage_type=storage_types[random.randint(len(storage_types))],
+            reaccess_target=random.choice(["internet", "within-cloud"]),
+            total_years_simulated=int(random.choice([1, 3, 10]))))
+    return scenarios
+
+scenarios = seeded_scenarios()
+
+
+@pytest.mark.parametrize("scenario", scenarios)
+def test_simulate_matches_original_loop(scenario):
+    expected = original_loop(scenario)
+    result = simulate(scenario)
+    for field in fields:
+        np.testing.assert_allclose(result[field], expected[field], rtol=1e-9, atol=1e-9, err_msg=field)
+
+def test_zero_tier1_retention_counts_as_one():
+    # the original loop indexes past its history for a zero retention
+    scenario = make_scenario(panel_count=5000, retention_time_tier1=1, retention_time_tier2=12)
+    zero = simulate(dict(scenario, retention_time_tier1=0))
+    expected = original_loop(scenario)
+    for field in fields:
+        np.testing.assert_allclose(zero[field], expected[field], rtol=1e-9, atol=1e-9, err_msg=field)
+
+@pytest.mark.parametrize("scenario", scenarios[:8])
+def test_closed_form_matches_simulate(scenario):
+    result = simulate(scenario)
+    months = np.unique(np.minimum([0, 1, scenario["retention_time_tier1"], scenario["months"] - 1],
+                                  scenario["months"] - 1))
+    costs = costs_at(scenario, months)
+    for field in ["tier1_storage_cost", "tier2_storage_cost", "reaccess_cost", "costs"]:
+        np.testing.assert_allclose(costs[field], result[field][months], rtol=1e-9, atol=1e-9, err_msg=field)
+    tier1, tier2 = occupancy_at(scenario, months)
+    np.testing.assert_allclose(tier1 + tier2, result["total_stored"][months], rtol=1e-9, atol=1e-9)
+
+def test_steady_state():
+    scenario = make_scenario(panel_count=3000, volume_growth=0, reaccess_count=100, retention_time_tier1=6,
+                             retention_time_tier2=12, reaccess_target="internet")
+    steady = steady_state(scenario)
+    result = simulate(scenario)
+    for field in ["tier1_storage_cost", "tier2_storage_cost", "reaccess_cost", "costs"]:
+        assert steady[field] == pytest.approx(result[field][-1], rel=1e-12)
+
+def test_batch_matches_simulate():
+    results = simulate_batch(scenarios)
+    for scenario, result in zip(scenarios, results):
+        expected = simulate(scenario)
+        for field in fields:
+            np.testing.assert_allclose(result[field], expected[field], rtol=1e-12, err_msg=field)
+
+@pytest.mark.parametrize("interval", [1, 3, 12])
+def test_resample_matches_original(interval):
+    # the original app reshaped whole bins only
+    costs = original_loop(make_scenario(panel_count=2000, retention_time_tier1=12, retention_time_tier2=12))["costs"]
+    assert len(costs) % 12 == 0
+    np.testing.assert_allclose(resample(costs, interval), costs.reshape(-1, interval).sum(axis=1))
+    np.testing.assert_allclose(resample(costs, interval, "max"), costs.reshape(-1, interval).max(axis=1))
+
+def test_resample_partial_bin():
+    a = np.arange(1., 8.)
+    np.testing.assert_allclose(resample(a, 3), [6, 15, 7])
+    np.testing.assert_allclose(resample(a, 3, "max"), [3, 6, 7])
+    np.testing.assert_allclose(resample(a, 12), [28])
+    assert resample(np.zeros(0), 3).shape == (0,)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from storagecosts import make_scenario, simulate
+from storagecosts.engine import simulate_occupancy
+from storagecosts.fleet import simulate_fleet
+from storagecosts.pricing import calc_storage_cost
+
+
+def test_class_pooled_across_tiers():
+    # lab a keeps S3 as tier1 and lab b as tier2, so their S3 is billed together
+    lab_a = make_scenario(genome_count=2000, retention_time_tier1=12, retention_time_tier2=24,
+                          tier1_storage_type="S3", tier2_storage_type="glacier")
+    lab_b = make_scenario(genome_count=3000, retention_time_tier1=6, retention_time_tier2=30,
+                          tier1_storage_type="S3IA", tier2_storage_type="S3")
+    result = simulate_fleet([("a", "shared", lab_a), ("b", "shared", lab_b)], processes=1)
+    a, b = simulate(lab_a), simulate(lab_b)
+
+    s3_stored = simulate_occupancy(lab_a)["tier1"] + simulate_occupancy(lab_b)["tier2"]
+    s3_cost = calc_storage_cost("S3", s3_stored)
+    np.testing.assert_allclose(result["tier1_storage_cost"][0] + result["tier2_storage_cost"][1], s3_cost)
+    share = np.divide(simulate_occupancy(lab_a)["tier1"], s3_stored, out=np.zeros_like(s3_stored), where=s3_stored > 0)
+    np.testing.assert_allclose(result["tier1_storage_cost"][0], s3_cost * share)
+    # classes held by one lab only are priced as that lab alone
+    np.testing.assert_allclose(result["tier2_storage_cost"][0], a["tier2_storage_cost"])
+    np.testing.assert_allclose(result["tier1_storage_cost"][1], b["tier1_storage_cost"])
+
+    standalone = [a["costs"].sum(), b["costs"].sum()]
+    np.testing.assert_allclose(result["standalone_lifetime_cost"], standalone)
+    assert result["fleet_costs"].sum() < sum(standalone)
+    assert result["costs"].sum() == pytest.approx(result["fleet_costs"].sum())
+
+def test_separate_accounts_are_not_pooled():
+    lab_a = make_scenario(genome_count=2000, tier1_storage_type="S3", tier2_storage_type="glacier")
+    lab_b = make_scenario(genome_count=3000, tier1_storage_type="S3IA", tier2_storage_type="S3")
+    result = simulate_fleet([("a", "one", lab_a), ("b", "two", lab_b)], processes=1)
+    np.testing.assert_allclose(result["costs"].sum(axis=1), result["standalone_lifetime_cost"])
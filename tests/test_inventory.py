@@ -0,0 +1,78 @@
+import gzip
+
+import numpy as np
+import pytest
+
+from storagecosts import pricing, read_inventory
+from storagecosts.inventory import bytes_per_gb
+
+rows = [
+    # bucket, key, size, last modified, storage class
+    ("b", "a.bam", 2 * bytes_per_gb, "2020-12-03T10:00:00.000Z", "STANDARD"),
+    ("b", "b.bam", 3 * bytes_per_gb, "2020-01-10T10:00:00.000Z", "GLACIER"),
+    ("b", "c.bam", 5 * bytes_per_gb, "2020-12-03T10:00:00.000Z", "INTELLIGENT_TIERING"),
+    ("b", "d.bam", 7 * bytes_per_gb, "2019-12-03T10:00:00.000Z", "GLACIER_IR"),
+    ("b", "e.bam", 11 * bytes_per_gb, "2020-11-03T10:00:00.000Z", "SNOWBALL_EDGE"),
+    ("b", "f.bam", 13 * bytes_per_gb, "2020-11-03T10:00:00.000Z", "SNOWBALL_EDGE"),
+    ("b", "g.bai", 17 * bytes_per_gb, "2020-11-03T10:00:00.000Z", ""),
+]
+
+def write_inventory(path, rows):
+    with gzip.open(str(path), "wt") as f:
+        for row in rows:
+            f.write(",".join('"%s"' % v for v in row) + "\n")
+
+def gb(cohorts, storage_type):
+    return cohorts.gb[pricing["storage_type_index"][storage_type]]
+
+
+def test_mixed_storage_classes(tmp_path):
+    path = tmp_path / "inventory.csv.gz"
+    write_inventory(path, rows)
+    with pytest.warns(UserWarning, match="2 inventory rows"):
+        cohorts = read_inventory(str(path), as_of=(2021, 1), chunk_rows=3)
+    assert cohorts.remapped == {"SNOWBALL_EDGE": 2}
+    # unknown classes and rows without a class are counted as S3
+    assert gb(cohorts, "S3")[1] == 2 + 5
+    assert gb(cohorts, "S3")[2] == 11 + 13 + 17
+    assert gb(cohorts, "glacier")[12] == 3
+    assert gb(cohorts, "glacier")[13] == 7
+    assert cohorts.gb.sum() == sum(row[2] for row in rows) / bytes_per_gb
+
+def test_default_storage_class(tmp_path):
+    path = tmp_path / "inventory.csv.gz"
+    write_inventory(path, rows[:1] + rows[4:5])
+    with pytest.warns(UserWarning):
+        cohorts = read_inventory(str(path), as_of=(2021, 1), default_storage_class="S3IA")
+    assert gb(cohorts, "S3IA")[2] == 11
+    with pytest.raises(ValueError):
+        read_inventory(str(path), default_storage_class="tape")
+
+def test_suffixes_and_header(tmp_path):
+    path = tmp_path / "listing.csv"
+    path.write_text("path,size,storage_class\nx.bam,%d,DEEP_ARCHIVE\nx.bai,%d,DEEP_ARCHIVE\n" % (
+        bytes_per_gb, bytes_per_gb))
+    cohorts = read_inventory(str(path), suffixes=(".bam",))
+    assert cohorts.remapped == {}
+    np.testing.assert_allclose(gb(cohorts, "deepglacier")[0], 1)
+
+@pytest.mark.parametrize("date, problem", [
+    ("2020-13-01T10:00:00.000Z", "malformed"),
+    ("12/03/2020", "malformed"),
+    ("2020", "malformed"),
+    ("2021-02-01T10:00:00.000Z", "after 2021-01"),
+])
+def test_bad_dates(tmp_path, date, problem):
+    path = tmp_path / "inventory.csv.gz"
+    bad = rows[:4] + [("b", "x.bam", bytes_per_gb, date, "STANDARD")]
+    write_inventory(path, bad)
+    with pytest.raises(ValueError, match="row 5: .*%s" % problem):
+        read_inventory(str(path), as_of=(2021, 1), chunk_rows=3)
+
+def test_dates_in_header_file(tmp_path):
+    path = tmp_path / "listing.csv"
+    path.write_text("path,size,last_modified\nx.bam,1,2020-12-01\ny.bam,1,\nz.bam,1,2020-1-01\n")
+    with pytest.raises(ValueError, match="row 4: malformed last_modified date '2020-1-01'"):
+        read_inventory(str(path), as_of=(2020, 12))
+    path.write_text("path,size,last_modified\nx.bam,%d,2020-12-01\ny.bam,%d,\n" % (bytes_per_gb, bytes_per_gb))
+    np.testing.assert_allclose(gb(read_inventory(str(path), as_of=(2020, 12)), "S3")[0], 2)
@@ -0,0 +1,93 @@
+import os
+import signal
+import time
+
+import pytest
+
+import app
+from app import jobs
+from app.jobs import JobRunner, JobStore
+from storagecosts import make_scenario
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite"), stale_after=0.4)
+
+@pytest.fixture
+def sleep_kind(monkeypatch):
+    # pool processes are forked on first use, so they see the patched kinds
+    monkeypatch.setitem(jobs.job_kinds, "sleep", time.sleep)
+
+def wait_for(condition, timeout=30):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+def finished(store, job_id):
+    return lambda: store.status(job_id)["status"] != "running"
+
+
+def test_progress(store):
+    job_id = store.create("sweep", 2)
+    store.add_result(job_id, 0, ["a"])
+    assert store.status(job_id) == {"kind": "sweep", "status": "running", "total": 2, "completed": 1, "error": None}
+    store.add_result(job_id, 1, ["b"])
+    assert store.status(job_id)["status"] == "done"
+    assert store.results(job_id) == {0: ["a"], 1: ["b"]}
+
+def test_orphaned_job_fails(store):
+    # the worker that would run its chunks is gone, so nothing touches it
+    job_id = store.create("sweep", 2)
+    store.add_result(job_id, 0, ["a"])
+    assert store.status(job_id)["status"] == "running"
+    time.sleep(0.5)
+    status = store.status(job_id)
+    assert status["status"] == "failed" and status["error"].startswith("no progress for 0.4 seconds")
+    # a result that still arrives revives the job
+    store.add_result(job_id, 1, ["b"])
+    assert store.status(job_id)["status"] == "done"
+    # jobs that failed for other reasons stay failed
+    job_id = store.create("sweep", 1)
+    store.fail(job_id, "ValueError: bad chunk")
+    store.add_result(job_id, 0, ["a"])
+    assert store.status(job_id)["status"] == "failed"
+
+def test_queued_and_long_chunks_stay_running(store, sleep_kind):
+    # the second job waits behind the first for longer than stale_after, and
+    # each chunk runs longer than that too
+    runner = JobRunner(store, processes=1, niceness=0)
+    first = runner.submit("sleep", [1.0])
+    second = runner.submit("sleep", [0.6])
+    time.sleep(1.2)
+    assert store.status(first)["status"] == "done"
+    assert store.status(second)["status"] == "running"
+    assert wait_for(finished(store, second))
+    assert store.status(second)["status"] == "done"
+
+def test_killed_pool_process(tmp_path, sleep_kind):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    runner = JobRunner(store, niceness=0)
+    job_id = runner.submit("sweep", [[make_scenario()]])
+    assert wait_for(finished(store, job_id))
+    job_id = runner.submit("sleep", [30])
+    pool = runner.pool
+    for pid in list(pool._processes):
+        os.kill(pid, signal.SIGKILL)
+    # the job fails with the pool, which is then replaced
+    assert wait_for(lambda: runner.pool is not pool and not runner.pending)
+    status = store.status(job_id)
+    assert status["status"] == "failed" and "BrokenProcessPool" in status["error"]
+    job_id = runner.submit("sweep", [[make_scenario()]])
+    assert wait_for(finished(store, job_id))
+    assert store.status(job_id)["status"] == "done"
+
+def test_update_sweep_stops_polling(store, monkeypatch):
+    monkeypatch.setattr(app.job_runner, "store", store)
+    job = {"job_id": store.create("sweep", 2), "parameter": "genome_count", "values": [1, 2], "current": 1}
+    children, disabled = app.update_sweep.__wrapped__(job, 1)
+    assert not disabled
+    time.sleep(0.5)
+    children, disabled = app.update_sweep.__wrapped__(job, 2)
+    assert disabled and "failed" in children[0].children
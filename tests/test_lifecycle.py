@@ -0,0 +1,74 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+
+from storagecosts import lifecycle_occupancy, make_scenario, parse_stages, simulate, simulate_lifecycle, tier_occupancy
+from storagecosts.engine import monthly_volumes
+from storagecosts.cli import main
+
+
+def cohort_loop(monthly_gb, retentions):
+    # every cohort placed by its age, one month at a time
+    boundaries = np.cumsum([np.inf if r is None else r for r in retentions])
+    stored = np.zeros((len(retentions), len(monthly_gb)))
+    for month in range(len(monthly_gb)):
+        for cohort in range(month + 1):
+            stage = np.searchsorted(boundaries, month - cohort, side="right")
+            if stage < len(retentions):
+                stored[stage, month] += monthly_gb[cohort]
+    return stored
+
+@pytest.mark.parametrize("retentions", [[12, 24, 60], [0, 5, None], [3, 0, 4, 2], [1], [None], [7, 7, 7, None]])
+def test_occupancy_matches_cohort_loop(retentions):
+    monthly_gb = np.random.RandomState(0).rand(90)
+    np.testing.assert_allclose(lifecycle_occupancy(monthly_gb, retentions), cohort_loop(monthly_gb, retentions))
+
+def test_occupancy_trials():
+    monthly_gb = np.random.RandomState(1).rand(3, 40)
+    stored = lifecycle_occupancy(monthly_gb, [5, 10])
+    for trial in range(3):
+        np.testing.assert_allclose(stored[:, trial], cohort_loop(monthly_gb[trial], [5, 10]))
+
+def test_parse_stages():
+    assert parse_stages("S3:12, S3IA:24,glacier") == [("S3", 12), ("S3IA", 24), ("glacier", None)]
+    for text in ["S3,glacier:12", "tape:12", "S3:-1", "S3:x"]:
+        with pytest.raises(ValueError):
+            parse_stages(text)
+
+def test_simulate_lifecycle():
+    scenario = make_scenario(genome_count=500, reaccess_count=200, total_years_simulated=10)
+    stages = parse_stages("S3:12,S3IA:24,glacier:60,deepglacier")
+    result = simulate_lifecycle(scenario, stages)
+    # nothing is deleted from the last stage
+    np.testing.assert_allclose(result["total_stored"], np.cumsum(result["total_gb_stored"]))
+    np.testing.assert_allclose(result["costs"], result["stage_storage_cost"].sum(axis=0) + result["reaccess_cost"])
+    assert result["reaccess_cost"].sum() > 0
+
+@pytest.mark.parametrize("r1, r2", [(1, 5), (3, 7), (12, 24), (6, 0)])
+def test_two_stages_differ_from_simulate(r1, r2):
+    # simulate keeps the first month's data in tier1 for good and moves later
+    # cohorts on after r1 - 1 months; a lifecycle moves every cohort after r1
+    scenario = make_scenario(panel_count=2000, volume_growth=20, retention_time_tier1=r1, retention_time_tier2=r2,
+                             total_years_simulated=5)
+    samples_run, monthly_gb = monthly_volumes(scenario)
+    tier1, tier2 = tier_occupancy(monthly_gb, r1, r2)
+    later = np.concatenate(([0.], monthly_gb[1:]))
+    stored = lifecycle_occupancy(later, [r1 - 1, r2])
+    np.testing.assert_allclose(tier1, stored[0] + monthly_gb[0])
+    np.testing.assert_allclose(tier2, stored[1])
+
+    stages = [(scenario["tier1_storage_type"], r1), (scenario["tier2_storage_type"], r2)]
+    assert simulate_lifecycle(scenario, stages)["costs"].sum() != pytest.approx(simulate(scenario)["costs"].sum())
+
+def test_cli(tmp_path):
+    scenarios = tmp_path / "scenarios.json"
+    scenarios.write_text(json.dumps([{"name": "a", "genome_count": 500}]))
+    output = tmp_path / "out.csv"
+    assert main([str(scenarios), "--lifecycle", "S3:12,glacier:60", "-o", str(output)]) == 0
+    rows = list(csv.DictReader(output.open()))
+    assert rows[0]["lifecycle"] == "S3:12,glacier:60"
+    assert float(rows[0]["stage1_storage_cost"]) > 0 and float(rows[0]["stage2_storage_cost"]) > 0
+    with pytest.raises(SystemExit):
+        main([str(scenarios), "--lifecycle", "tape:12"])
@@ -0,0 +1,25 @@
+import json
+
+import flask
+
+from app.metrics import Metrics, instrument_server
+
+
+def test_unknown_outputs_are_grouped(tmp_path):
+    server = flask.Flask(__name__)
+    metrics = Metrics(str(tmp_path / "metrics.sqlite"))
+    instrument_server(server, metrics, outputs={"data-store.data": {}})
+
+    @server.route("/_dash-update-component", methods=["POST"])
+    def update():
+        return "{}"
+
+    client = server.test_client()
+    for output in ["data-store.data", "data-store.data", "x" * 1000, "y", ["data-store.data"]]:
+        client.post("/_dash-update-component", json={"output": output})
+    client.post("/_dash-update-component", json={})
+
+    counts = {json.loads(labels)["output"]: count
+              for (name, labels), (buckets, total, count) in metrics.collect().items()
+              if name == "storagecosts_request_seconds"}
+    assert counts == {"data-store.data": 2, "other": 4}
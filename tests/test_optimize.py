@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from storagecosts import make_scenario, optimize_retention_split, simulate, tier_occupancy
+from storagecosts.engine import monthly_volumes
+
+pairs = [("S3", "glacier"), ("S3IA", "deepglacier"), ("glacier", "S3")]
+
+
+@pytest.mark.parametrize("volume_growth", [0, 5, 20])
+def test_occupancy_is_never_negative(volume_growth):
+    scenario = make_scenario(panel_count=2000, volume_growth=volume_growth, retention_time_tier1=0,
+                             retention_time_tier2=24)
+    samples_run, monthly_gb = monthly_volumes(scenario)
+    splits = np.arange(0, 25)
+    tier1, tier2 = tier_occupancy(monthly_gb, splits[:, None], 24 - splits[:, None])
+    assert (tier1 >= 0).all() and (tier2 >= 0).all()
+    # a tier1 retention under a month is the same as one month
+    np.testing.assert_array_equal(tier1[0], tier1[1])
+
+def test_splits_match_simulate():
+    scenario = make_scenario(genome_count=300, panel_count=2000, volume_growth=20, reaccess_count=500,
+                             retention_time_tier1=6, retention_time_tier2=30)
+    result = optimize_retention_split(scenario, pairs)
+    assert list(result["splits"]) == list(range(1, 37))
+    for i, (tier1_type, tier2_type) in enumerate(pairs):
+        for j, split in enumerate(result["splits"]):
+            split_scenario = dict(scenario, tier1_storage_type=tier1_type, tier2_storage_type=tier2_type,
+                                  retention_time_tier1=int(split), retention_time_tier2=36 - int(split))
+            expected = simulate(split_scenario)["costs"].sum()
+            assert result["cost_matrix"][i, j] == pytest.approx(expected, rel=1e-12)
+    best = result["best"]
+    assert best["lifetime_cost"] == result["cost_matrix"].min() > 0
+    assert best["retention_time_tier1"] >= 1
+    assert result["current_cost"] == pytest.approx(result["cost_matrix"][0, 5])
+
+def test_zero_tier1_retention():
+    scenario = make_scenario(panel_count=2000, volume_growth=20, retention_time_tier1=0, retention_time_tier2=24)
+    result = optimize_retention_split(scenario)
+    assert (result["cost_matrix"] > 0).all()
+    assert result["current_cost"] == pytest.approx(simulate(scenario)["costs"].sum())
+    with pytest.raises(ValueError):
+        optimize_retention_split(scenario, total_retention=0)